@@ -9,8 +9,17 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
+from asgiref.sync import ThreadSensitiveContext
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram_backend.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+
+async def application(scope, receive, send):
+    # Django 3.2 выполняет все синхронные представления в одном потоке
+    # процесса. Отдельный контекст дает каждому запросу свой поток, как
+    # это делает ASGIHandler начиная с Django 4.0.
+    async with ThreadSensitiveContext():
+        await django_application(scope, receive, send)
@@ -23,6 +23,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'django_filters',
@@ -62,6 +63,23 @@ TEMPLATES = [
 WSGI_APPLICATION = 'foodgram_backend.wsgi.application'
 
 
+# Класс воркеров gunicorn, см. gunicorn.conf.py.
+GUNICORN_WORKER_CLASS = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+
+# Асинхронные версии коротких ссылок и списков тегов и ингредиентов имеют
+# смысл только под ASGI, в WSGI каждая из них запускала бы event loop.
+ASYNC_VIEWS = os.getenv(
+    'ASYNC_VIEWS', str(GUNICORN_WORKER_CLASS == 'uvicorn'),
+) == 'True'
+
+# Синхронные воркеры переиспользуют соединение с базой между запросами.
+# У асинхронных каждая задача открывает свое соединение, и постоянные
+# соединения лишь копились бы, поэтому для них по умолчанию 0.
+DB_CONN_MAX_AGE = int(os.getenv(
+    'DB_CONN_MAX_AGE',
+    60 if GUNICORN_WORKER_CLASS in ('sync', 'gthread') else 0,
+))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -70,6 +88,23 @@ DATABASES = {
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', ''),
         'PORT': os.getenv('DB_PORT', 5432),
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        # При работе через PgBouncer в режиме пулинга транзакций
+        # серверные курсоры недоступны.
+        'DISABLE_SERVER_SIDE_CURSORS': (
+            os.getenv('DB_DISABLE_SERVER_SIDE_CURSORS', 'False') == 'True'
+        ),
+        # TCP keepalive позволяет обнаружить разорванное постоянное
+        # соединение до того, как на нем упадет запрос.
+        'OPTIONS': {
+            'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', 5)),
+            'keepalives': 1,
+            'keepalives_idle': int(os.getenv('DB_KEEPALIVES_IDLE', 60)),
+            'keepalives_interval': int(
+                os.getenv('DB_KEEPALIVES_INTERVAL', 10),
+            ),
+            'keepalives_count': int(os.getenv('DB_KEEPALIVES_COUNT', 3)),
+        },
     }
 }
 
@@ -105,16 +140,77 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'collected_static'
 
+# В кеше хранятся версии моделей, по которым сбрасываются кеши ответов и
+# токенов, поэтому он должен быть общим для всех процессов gunicorn.
+# Локальный кеш процесса (LocMemCache) подходит только для одного воркера.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache',
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', '/tmp/foodgram-cache'),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 10000)),
+        },
+    },
+}
+
+# Данные ответов для анонимных пользователей, сбрасываются по версиям
+# моделей при их изменении.
+RESPONSE_CACHE_ALIAS = os.getenv('RESPONSE_CACHE_ALIAS', 'default')
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 600))
+
+# Уже выданные короткие ссылки не пересчитываются, поэтому значение
+# можно только увеличивать.
+SHORT_LINK_MIN_LENGTH = int(os.getenv('SHORT_LINK_MIN_LENGTH', 4))
+
+SHORT_LINK_CACHE_SIZE = int(os.getenv('SHORT_LINK_CACHE_SIZE', 10000))
+SHORT_LINK_CACHE_TTL = int(os.getenv('SHORT_LINK_CACHE_TTL', 3600))
+# Алиас из CACHES для общего кеша между процессами, по умолчанию отключен.
+# После удаления рецепта другие процессы еще до SHORT_LINK_CACHE_TTL секунд
+# перенаправляют на его страницу из своей памяти.
+SHORT_LINK_CACHE_BACKEND = os.getenv('SHORT_LINK_CACHE_BACKEND') or None
+
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 10000))
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', 60))
+
+INGREDIENT_CATALOGUE_TTL = int(os.getenv('INGREDIENT_CATALOGUE_TTL', 300))
+# Справочник больше INGREDIENT_CATALOGUE_MAX_SIZE строк не загружается
+# в память, поиск по нему идет в базе по триграммному индексу.
+INGREDIENT_CATALOGUE_MAX_SIZE = int(
+    os.getenv('INGREDIENT_CATALOGUE_MAX_SIZE', 20000),
+)
+
+# Списки без фильтров по таблицам больше COUNT_ESTIMATE_MIN строк считаются
+# по статистике PostgreSQL, остальные кешируются на COUNT_CACHE_TTL секунд.
+COUNT_ESTIMATE_MIN = int(os.getenv('COUNT_ESTIMATE_MIN', 10000))
+COUNT_CACHE_TTL = int(os.getenv('COUNT_CACHE_TTL', 30))
+
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+)
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Загруженные картинки перекодируются в IMAGE_FORMAT (WEBP или JPEG)
+# вместе с миниатюрами рецептов в IMAGE_WORKERS фоновых потоках
+# (0 — сразу после фиксации транзакции в потоке запроса).
+IMAGE_FORMAT = os.getenv('IMAGE_FORMAT', 'WEBP').upper()
+IMAGE_QUALITY = int(os.getenv('IMAGE_QUALITY', 85))
+IMAGE_MAX_SIDE = int(os.getenv('IMAGE_MAX_SIDE', 4096))
+RECIPE_THUMBNAIL_SIDE = int(os.getenv('RECIPE_THUMBNAIL_SIDE', 480))
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', 2))
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 6,
@@ -1,7 +1,11 @@
+from django.conf import settings
 from django.contrib import admin
 from django.urls import include, path
 
-from recipes.views import redirect_short_link
+if settings.ASYNC_VIEWS:
+    from recipes.async_views import redirect_short_link
+else:
+    from recipes.views import redirect_short_link
 
 urlpatterns = [
     path('admin/', admin.site.urls),
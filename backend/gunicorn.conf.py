@@ -0,0 +1,41 @@
+import multiprocessing
+import os
+
+WORKER_CLASSES = {
+    'sync': 'sync',
+    'gthread': 'gthread',
+    'uvicorn': 'uvicorn.workers.UvicornWorker',
+}
+
+worker_class_name = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+if worker_class_name not in WORKER_CLASSES:
+    raise ValueError(
+        'GUNICORN_WORKER_CLASS должен быть одним из: '
+        f'{", ".join(WORKER_CLASSES)}.'
+    )
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8050')
+worker_class = WORKER_CLASSES[worker_class_name]
+# Асинхронный воркер сам обслуживает много соединений, синхронным нужен
+# запас процессов на время ожидания базы.
+workers = int(os.getenv(
+    'GUNICORN_WORKERS',
+    multiprocessing.cpu_count() * (1 if worker_class_name == 'uvicorn' else 2)
+    + 1,
+))
+# При threads > 1 gunicorn сам заменяет sync-воркер на gthread.
+threads = int(os.getenv(
+    'GUNICORN_THREADS', 4 if worker_class_name == 'gthread' else 1,
+))
+# Версии моделей в локальном кеше процесса не видны другим воркерам, и
+# они отдавали бы устаревшие ответы.
+if workers > 1 and os.getenv('CACHE_BACKEND', '').endswith('LocMemCache'):
+    raise ValueError(
+        'CACHE_BACKEND=LocMemCache допустим только при GUNICORN_WORKERS=1.'
+    )
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+wsgi_app = (
+    'foodgram_backend.asgi:application' if worker_class_name == 'uvicorn'
+    else 'foodgram_backend.wsgi:application'
+)
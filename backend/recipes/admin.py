@@ -33,22 +33,51 @@ class TagAdmin(admin.ModelAdmin):
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
     list_display = (
-        'name', 'author', 'display_tags', 'favorite_count'
+        'name', 'author', 'display_tags', 'favorites_count',
+        'in_carts_count',
     )
     search_fields = (
         'name', 'author__username',
     )
     list_filter = ('tags',)
+    list_select_related = ('author',)
     ordering = ('-pub_date',)
+    # Точное число строк в большой таблице считается слишком долго.
+    show_full_result_count = False
     inlines = (
         IngredientInRecipeInline,
     )
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('tags')
+
+    def save_model(self, request, obj, form, change):
+        if 'image' in form.changed_data:
+            obj.thumbnail = ''
+        super().save_model(request, obj, form, change)
+
     def display_tags(self, obj):
         return ', '.join([tag.name for tag in obj.tags.all()])
 
     display_tags.short_description = 'Теги'
 
 
-admin.site.register(Favorite)
-admin.site.register(ShoppingCart)
+class UserRecipeAdmin(admin.ModelAdmin):
+    """Общие настройки для избранного и корзины."""
+
+    list_display = ('user', 'recipe')
+    # В __str__ рецепта участвует автор.
+    list_select_related = ('user', 'recipe__author')
+    search_fields = ('user__username', 'recipe__name')
+    raw_id_fields = ('user', 'recipe')
+    show_full_result_count = False
+
+
+@admin.register(Favorite)
+class FavoriteAdmin(UserRecipeAdmin):
+    pass
+
+
+@admin.register(ShoppingCart)
+class ShoppingCartAdmin(UserRecipeAdmin):
+    pass
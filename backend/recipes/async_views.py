@@ -0,0 +1,124 @@
+"""Асинхронные версии эндпоинтов, которые чаще всего отвечают из кеша.
+
+Подключаются вместо синхронных при запуске через ASGI (ASYNC_VIEWS).
+Анонимный GET за JSON обслуживается одним вызовом sync_to_async без стека
+DRF, остальные запросы (другие методы, ?format=, браузерный API,
+заголовок Authorization) передаются синхронному вьюсету, чтобы ответы не
+отличались.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseRedirect
+from django.utils.cache import get_conditional_response
+from rest_framework.renderers import JSONRenderer
+
+from recipes.cache import short_link_cache
+from recipes.catalogue import ingredient_catalogue
+from recipes.filters import IngredientFilter
+from recipes.models import Ingredient, Tag
+from recipes.response_cache import (get_cache, get_validators, get_versions,
+                                    set_validators)
+from recipes.serializers import IngredientSerializer, TagSerializer
+from recipes.views import IngredientViewSet, TagViewSet, get_short_link_target
+
+# Те же параметры, что передает роутер для списков.
+sync_tag_list = TagViewSet.as_view(
+    {'get': 'list'}, basename='tags', detail=False, suffix='List',
+)
+sync_ingredient_list = IngredientViewSet.as_view(
+    {'get': 'list'}, basename='ingredients', detail=False, suffix='List',
+)
+
+
+async def redirect_short_link(request, link):
+    """Перенаправление с короткой ссылки на нужный рецепт."""
+    pk = short_link_cache.get_local(link)
+    if pk is None:
+        pk = await sync_to_async(get_short_link_target)(link)
+    return HttpResponseRedirect(f'/recipes/{pk}')
+
+
+def is_plain_json_get(request):
+    """Анонимный GET, на который вьюсет ответил бы JSON.
+
+    Запросы с заголовком Authorization проходят аутентификацию DRF во
+    вьюсете, чтобы неверный токен получал 401.
+    """
+    accept = request.META.get('HTTP_ACCEPT') or '*/*'
+    return (
+        request.method == 'GET'
+        and 'HTTP_AUTHORIZATION' not in request.META
+        and 'format' not in request.GET
+        and 'text/html' not in accept
+        and ('application/json' in accept or '*/*' in accept)
+    )
+
+
+def render_view(view, request):
+    response = view(request)
+    if hasattr(response, 'render'):
+        response.render()
+    return response
+
+
+def respond(request, labels, render):
+    """Ответ с ETag и Last-Modified по версиям моделей labels."""
+    fingerprint = get_versions(labels)
+    etag, last_modified = get_validators(request, fingerprint)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified,
+    )
+    if response is None:
+        response = HttpResponse(
+            render(request, fingerprint), content_type='application/json',
+        )
+    return set_validators(response, etag, last_modified)
+
+
+async def json_list(request, labels, render, view):
+    if not is_plain_json_get(request):
+        return await sync_to_async(render_view)(view, request)
+    return await sync_to_async(respond)(request, labels, render)
+
+
+def render_tags(request, fingerprint):
+    cache = get_cache()
+    key = f'response:tags-json:{":".join(map(str, fingerprint))}'
+    content = cache.get(key)
+    if content is None:
+        content = JSONRenderer().render(
+            TagSerializer(Tag.objects.all(), many=True).data,
+        )
+        cache.set(key, content, settings.RESPONSE_CACHE_TTL)
+    return content
+
+
+def render_ingredients(request, fingerprint):
+    if not ingredient_catalogue.is_available():
+        queryset = IngredientFilter(request.GET, Ingredient.objects.all()).qs
+        return JSONRenderer().render(
+            IngredientSerializer(queryset, many=True).data,
+        )
+    name = request.GET.get('name')
+    if name:
+        return JSONRenderer().render(ingredient_catalogue.search(name))
+    return ingredient_catalogue.as_json()
+
+
+async def tag_list(request):
+    return await json_list(
+        request, ('recipes.tag',), render_tags, sync_tag_list,
+    )
+
+
+async def ingredient_list(request):
+    return await json_list(
+        request, ('recipes.ingredient',), render_ingredients,
+        sync_ingredient_list,
+    )
+
+
+# csrf_exempt в Django 3.2 оборачивает представление в синхронную функцию,
+# поэтому флаг выставляется напрямую, как для вьюсетов DRF.
+tag_list.csrf_exempt = True
+ingredient_list.csrf_exempt = True
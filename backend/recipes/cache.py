@@ -0,0 +1,105 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+MISSING = object()
+
+
+class LRUCache:
+    """Ограниченный LRU-кеш процесса с временем жизни записей.
+
+    При заданном backend записи дублируются в кеш Django, чтобы промах
+    в одном процессе мог быть закрыт значением, сохраненным другим.
+    """
+
+    def __init__(self, maxsize, ttl, backend=None, prefix=''):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.backend = backend
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _shared(self):
+        return caches[self.backend] if self.backend else None
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, MISSING)
+            if item is not MISSING:
+                value, expires = item
+                if expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+        shared = self._shared()
+        if shared is not None:
+            value = shared.get(self.prefix + str(key), MISSING)
+            if value is not MISSING:
+                self._store(key, value)
+                with self._lock:
+                    self.hits += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        return default
+
+    def get_local(self, key, default=None):
+        """Значение только из памяти процесса, без обращения к кешу Django.
+
+        Не выполняет ввода-вывода, поэтому безопасно для асинхронного кода.
+        """
+        with self._lock:
+            item = self._data.get(key, MISSING)
+            if item is not MISSING and item[1] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return item[0]
+        return default
+
+    def _store(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def set(self, key, value):
+        self._store(key, value)
+        shared = self._shared()
+        if shared is not None:
+            shared.set(self.prefix + str(key), value, self.ttl)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+        shared = self._shared()
+        if shared is not None:
+            shared.delete(self.prefix + str(key))
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+            }
+
+
+short_link_cache = LRUCache(
+    maxsize=settings.SHORT_LINK_CACHE_SIZE,
+    ttl=settings.SHORT_LINK_CACHE_TTL,
+    backend=settings.SHORT_LINK_CACHE_BACKEND,
+    prefix='short-link:',
+)
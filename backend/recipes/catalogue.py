@@ -0,0 +1,94 @@
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+
+from recipes.constants import INGREDIENT_SEARCH_LIMIT
+from recipes.models import Ingredient
+from recipes.response_cache import get_versions
+from recipes.serializers import IngredientSerializer
+
+
+class IngredientCatalogue:
+    """Справочник ингредиентов в памяти процесса.
+
+    Загружается при первом обращении и сбрасывается сигналами при
+    изменении ингредиентов. Остальные процессы замечают изменение по версии
+    модели в общем кеше, а при локальном кеше перечитывают справочник по
+    истечении INGREDIENT_CATALOGUE_TTL. Справочник больше max_size строк
+    не загружается, тогда is_available() возвращает False.
+    """
+
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._state = None
+
+    def invalidate(self):
+        with self._lock:
+            self._state = None
+
+    def _get_state(self):
+        version, = get_versions((Ingredient._meta.label_lower,))
+        with self._lock:
+            state = self._state
+            if (
+                state is None
+                or state['version'] != version
+                or state['expires'] <= time.monotonic()
+            ):
+                state = self._state = self._load(version)
+            return state
+
+    def _load(self, version):
+        if Ingredient.objects.all()[self.max_size:].exists():
+            return {
+                'ingredients': None,
+                'version': version,
+                'expires': time.monotonic() + self.ttl,
+            }
+        ingredients = sorted(
+            IngredientSerializer(Ingredient.objects.all(), many=True).data,
+            key=lambda item: (item['name'].casefold(), item['id']),
+        )
+        return {
+            'ingredients': ingredients,
+            'keys': [item['name'].casefold() for item in ingredients],
+            'json': JSONRenderer().render(ingredients),
+            'version': version,
+            'expires': time.monotonic() + self.ttl,
+        }
+
+    def is_available(self):
+        return self._get_state()['ingredients'] is not None
+
+    def as_json(self):
+        """Весь справочник, заранее сериализованный в JSON."""
+        return self._get_state()['json']
+
+    def search(self, query, limit=INGREDIENT_SEARCH_LIMIT):
+        """Сначала совпадения по началу названия, затем по подстроке."""
+        state = self._get_state()
+        keys, ingredients = state['keys'], state['ingredients']
+        query = query.casefold()
+        results = []
+        start = bisect_left(keys, query)
+        end = start
+        while end < len(keys) and keys[end].startswith(query):
+            end += 1
+        results.extend(ingredients[start:end][:limit])
+        for key, ingredient in zip(keys, ingredients):
+            if len(results) >= limit:
+                break
+            if query in key and not key.startswith(query):
+                results.append(ingredient)
+        return results
+
+
+ingredient_catalogue = IngredientCatalogue(
+    ttl=settings.INGREDIENT_CATALOGUE_TTL,
+    max_size=settings.INGREDIENT_CATALOGUE_MAX_SIZE,
+)
@@ -1,7 +1,18 @@
+from string import ascii_letters, digits
+
 MAX_LENGTH_TAG = 32
 MAX_LENGTH_INGREDIENT_NAME = 128
 MAX_LENGTH_MEASUREMENT_UNIT = 64
 MAX_LENGTH_RECIPE_NAME = 256
-MAX_LENGTH_SHORT_LINK = 3
+MAX_LENGTH_SHORT_LINK = 11
 MIN_COOKING_TIME = 1
 MIN_AMOUNT = 1
+SHOPPING_LIST_CHUNK_SIZE = 2000
+PDF_CHUNK_SIZE = 64 * 1024
+SHORT_LINK_ALPHABET = digits + ascii_letters
+INGREDIENT_SEARCH_LIMIT = 50
+IMAGE_UPLOAD_FORMATS = ('JPEG', 'PNG', 'WEBP', 'GIF')
+RECIPE_ORDERINGS = {
+    'newest': ('-pub_date', '-id'),
+    'popular': ('-favorites_count', '-id'),
+}
@@ -0,0 +1,38 @@
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+# (модель со счетчиком, поле счетчика, модель записей, ссылка на владельца)
+COUNTERS = (
+    ('recipes.Recipe', 'favorites_count', 'recipes.Favorite', 'recipe'),
+    ('recipes.Recipe', 'in_carts_count', 'recipes.ShoppingCart', 'recipe'),
+    ('users.CustomUser', 'recipes_count', 'recipes.Recipe', 'author'),
+)
+
+
+def change_counter(model, pk, field, delta):
+    """Атомарно меняет счетчик на delta, не опуская его ниже нуля."""
+    model.objects.filter(pk=pk).update(
+        **{field: Greatest(F(field) + delta, Value(0))},
+    )
+
+
+def recount(apps):
+    """Пересчитывает все счетчики по фактическим данным.
+
+    Возвращает количество исправленных строк для каждого счетчика.
+    """
+    fixed = {}
+    for owner_label, field, related_label, owner_field in COUNTERS:
+        owner = apps.get_model(owner_label)
+        related = apps.get_model(related_label)
+        actual = Coalesce(Subquery(
+            related.objects.filter(
+                **{owner_field: OuterRef('pk')},
+            ).order_by().values(owner_field).annotate(
+                total=Count('pk'),
+            ).values('total'),
+        ), 0)
+        fixed[f'{owner_label}.{field}'] = owner.objects.exclude(
+            **{field: actual},
+        ).update(**{field: actual})
+    return fixed
@@ -1,5 +1,7 @@
+from django.db.models import Case, IntegerField, Value, When
 from django_filters import rest_framework as custom_filter
 
+from recipes.constants import INGREDIENT_SEARCH_LIMIT
 from recipes.models import Ingredient, Recipe, Tag
 
 
@@ -40,7 +42,10 @@ class RecipeFilter(custom_filter.FilterSet):
 
 
 class IngredientFilter(custom_filter.FilterSet):
-    """Кастомный фильтр для ингредиентов."""
+    """Кастомный фильтр для ингредиентов.
+
+    Используется, когда справочник слишком велик для памяти процесса.
+    """
 
     name = custom_filter.CharFilter(
         method='filter_name',
@@ -53,4 +58,10 @@ class IngredientFilter(custom_filter.FilterSet):
     def filter_name(self, queryset, name, value):
         return queryset.filter(
             name__icontains=value,
-        ).order_by('name')
+        ).annotate(
+            is_prefix=Case(
+                When(name__istartswith=value, then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField(),
+            ),
+        ).order_by('is_prefix', 'name')[:INGREDIENT_SEARCH_LIMIT]
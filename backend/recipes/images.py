@@ -0,0 +1,152 @@
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+from rest_framework import serializers
+
+from recipes.constants import IMAGE_UPLOAD_FORMATS
+from recipes.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(
+    max_workers=max(settings.IMAGE_WORKERS, 1),
+    thread_name_prefix='images',
+)
+
+
+def encode_image(image, name):
+    """Кодирует изображение в IMAGE_FORMAT без метаданных исходного файла."""
+    image_format = settings.IMAGE_FORMAT
+    has_alpha = image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+    if image_format == 'JPEG' or not has_alpha:
+        image = image.convert('RGB')
+    else:
+        image = image.convert('RGBA')
+    buffer = io.BytesIO()
+    # EXIF, ICC-профиль и прочие данные передаются в save только явно,
+    # поэтому в результат они не попадают.
+    image.save(buffer, image_format, quality=settings.IMAGE_QUALITY)
+    return ContentFile(
+        buffer.getvalue(), name=f'{name}.{image_format.lower()}',
+    )
+
+
+def validate_image(file):
+    """Проверяет формат и размер изображения по заголовку файла.
+
+    Пиксели не декодируются: перекодирование выполняется в фоновом потоке
+    после сохранения (schedule_image_processing).
+    """
+    file.seek(0)
+    with Image.open(file) as image:
+        image_format, size = image.format, image.size
+    file.seek(0)
+    if image_format not in IMAGE_UPLOAD_FORMATS:
+        raise serializers.ValidationError(
+            'Поддерживаются форматы: '
+            f'{", ".join(IMAGE_UPLOAD_FORMATS)}.'
+        )
+    if max(size) > settings.IMAGE_MAX_SIDE:
+        raise serializers.ValidationError(
+            'Размер изображения не должен превышать '
+            f'{settings.IMAGE_MAX_SIDE} пикселей по большей стороне.'
+        )
+    return file
+
+
+def open_image(name):
+    """Загружает изображение из хранилища с учетом ориентации из EXIF."""
+    with default_storage.open(name) as file:
+        with Image.open(file) as image:
+            image = ImageOps.exif_transpose(image)
+            image.load()
+    return image
+
+
+def save_image(image, field, name):
+    content = encode_image(image, name)
+    return default_storage.save(
+        field.generate_filename(None, content.name), content,
+    )
+
+
+def replace_image(model, pk, field_name, original, names):
+    """Подставляет обработанные файлы вместо исходного.
+
+    Файлы подставляются, только если картинка не сменилась за время
+    обработки. Объект сохраняется через save(), поэтому сигналы сбрасывают
+    кеши ответов и токенов.
+    """
+    with transaction.atomic():
+        instance = model.objects.select_for_update().filter(
+            pk=pk, **{field_name: original},
+        ).first()
+        if instance is None:
+            replaced = names.values()
+        else:
+            replaced = [original] + [
+                getattr(instance, field).name for field in names
+                if getattr(instance, field) and field != field_name
+            ]
+            for field, name in names.items():
+                setattr(instance, field, name)
+            instance.save()
+    for name in replaced:
+        default_storage.delete(name)
+
+
+def process_recipe_image(recipe_id, image_name):
+    """Перекодирует картинку рецепта и создает миниатюру для списков."""
+    image = open_image(image_name)
+    names = {'image': save_image(
+        image, Recipe._meta.get_field('image'), 'image',
+    )}
+    image.thumbnail((settings.RECIPE_THUMBNAIL_SIDE,) * 2)
+    names['thumbnail'] = save_image(
+        image, Recipe._meta.get_field('thumbnail'), 'thumbnail',
+    )
+    replace_image(Recipe, recipe_id, 'image', image_name, names)
+
+
+def process_avatar(user_id, avatar_name):
+    """Перекодирует аватар пользователя."""
+    User = get_user_model()
+    image = open_image(avatar_name)
+    names = {'avatar': save_image(
+        image, User._meta.get_field('avatar'), 'avatar',
+    )}
+    replace_image(User, user_id, 'avatar', avatar_name, names)
+
+
+def run_safely(func, *args):
+    try:
+        func(*args)
+    except Exception:
+        logger.exception('Не удалось обработать изображение %s', args[-1])
+
+
+def run_in_worker(func, *args):
+    try:
+        run_safely(func, *args)
+    finally:
+        # У каждого потока пула свое соединение с базой.
+        connection.close()
+
+
+def schedule_image_processing(func, *args):
+    """Ставит обработку изображения в очередь после фиксации транзакции."""
+    if not settings.IMAGE_WORKERS:
+        transaction.on_commit(lambda: run_safely(func, *args))
+        return
+    transaction.on_commit(
+        lambda: executor.submit(run_in_worker, func, *args),
+    )
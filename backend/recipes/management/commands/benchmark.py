@@ -0,0 +1,370 @@
+import base64
+import io
+import json
+import random
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.cache import short_link_cache
+from recipes.catalogue import ingredient_catalogue
+from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
+                            ShoppingCart, Tag)
+from recipes.shopping_list import rebuild_shopping_lists
+from users.authentication import token_cache
+from users.models import Follow
+
+User = get_user_model()
+
+BENCHMARK_PASSWORD = 'benchmark-password'
+
+
+class Rollback(Exception):
+    """Откат синтетических данных после прогона."""
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный прогон API на синтетических данных: число SQL-запросов, '
+        'p50/p95 задержки и размер ответа для каждого эндпоинта в JSON. '
+        'Все данные создаются в транзакции и откатываются после прогона.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--recipes', type=int, default=200)
+        parser.add_argument('--ingredients', type=int, default=500)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--favorites', type=int, default=1000)
+        parser.add_argument('--follows', type=int, default=200)
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Количество запросов на каждый эндпоинт.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output',
+                            help='Файл для результата, по умолчанию stdout.')
+
+    def seed(self, options):
+        rnd = random.Random(options['seed'])
+        users = User.objects.bulk_create(
+            User(
+                email=f'benchmark{i}@example.com',
+                username=f'benchmark{i}',
+                first_name='Benchmark',
+                last_name=str(i),
+                password='!',
+            )
+            for i in range(max(options['users'], 2))
+        )
+        viewer = users[0]
+        viewer.set_password(BENCHMARK_PASSWORD)
+        viewer.avatar = 'users/benchmark.jpg'
+        viewer.save(update_fields=('password', 'avatar'))
+        tags = Tag.objects.bulk_create(
+            Tag(name=f'benchmark{i}', slug=f'benchmark{i}') for i in range(3)
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'benchmark {i}', measurement_unit='г')
+            for i in range(max(options['ingredients'],
+                               options['ingredients_per_recipe']))
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author=rnd.choice(users),
+                name=f'Benchmark recipe {i}',
+                image='recipes/images/benchmark.jpg',
+                text='Benchmark recipe text.',
+                cooking_time=rnd.randint(1, 120),
+            )
+            for i in range(max(options['recipes'], 2))
+        )
+        recipe_tags = Recipe.tags.through
+        recipe_tags.objects.bulk_create(
+            recipe_tags(recipe_id=recipe.id, tag_id=tag.id)
+            for recipe in recipes
+            for tag in rnd.sample(tags, rnd.randint(1, len(tags)))
+        )
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(
+                recipe=recipe, ingredient=ingredient,
+                amount=rnd.randint(1, 500),
+            )
+            for recipe in recipes
+            for ingredient in rnd.sample(
+                ingredients, options['ingredients_per_recipe'],
+            )
+        )
+        pairs = {
+            (rnd.choice(users).id, rnd.choice(recipes).id)
+            for _ in range(options['favorites'])
+        }
+        # У зрителя всегда есть и отмеченные, и свободные рецепты.
+        pairs.discard((viewer.id, recipes[1].id))
+        pairs.add((viewer.id, recipes[0].id))
+        Favorite.objects.bulk_create(
+            Favorite(user_id=user_id, recipe_id=recipe_id)
+            for user_id, recipe_id in pairs
+        )
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(user_id=user_id, recipe_id=recipe_id)
+            for user_id, recipe_id in pairs
+        )
+        # Пакетная вставка не обновляет сохраненные списки покупок.
+        rebuild_shopping_lists({user_id for user_id, _ in pairs})
+        follows = {
+            (rnd.choice(users).id, rnd.choice(users).id)
+            for _ in range(options['follows'])
+        }
+        follows = {pair for pair in follows if pair[0] != pair[1]}
+        follows.discard((viewer.id, users[1].id))
+        Follow.objects.bulk_create(
+            Follow(user_id=user_id, following_id=following_id)
+            for user_id, following_id in follows
+        )
+        Follow.objects.get_or_create(user=viewer, following=users[-1])
+        return {
+            'viewer': viewer,
+            'token': Token.objects.create(user=viewer),
+            'author': users[1],
+            'followed': users[-1],
+            'tag': tags[0],
+            'ingredients': ingredients,
+            'own_recipe': Recipe.objects.filter(author=viewer).first()
+            or Recipe.objects.create(
+                author=viewer, name='Benchmark own recipe',
+                image='recipes/images/benchmark.jpg',
+                text='Benchmark recipe text.', cooking_time=1,
+            ),
+            'marked_recipe': recipes[0],
+            'free_recipe': recipes[1],
+        }
+
+    def get_image(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (64, 64), 'white').save(buffer, 'PNG')
+        return 'data:image/png;base64,' + base64.b64encode(
+            buffer.getvalue(),
+        ).decode()
+
+    def get_endpoints(self, data):
+        """Список (название, метод, путь, авторизация, тело запроса)."""
+        own = data['own_recipe'].id
+        marked = data['marked_recipe'].id
+        free = data['free_recipe'].id
+        tag = data['tag']
+        ingredient = data['ingredients'][0]
+        recipe_payload = {
+            'tags': [tag.id],
+            'ingredients': [
+                {'id': item.id, 'amount': 10}
+                for item in data['ingredients'][:5]
+            ],
+            'name': 'Benchmark',
+            'image': self.get_image(),
+            'text': 'Benchmark recipe text.',
+            'cooking_time': 10,
+        }
+        link = f'/s/{Recipe.objects.get(id=marked).short_link}/'
+        return [
+            ('tags-list', 'get', '/api/tags/', False, None),
+            ('tags-detail', 'get', f'/api/tags/{tag.id}/', False, None),
+            ('ingredients-list', 'get', '/api/ingredients/', False, None),
+            ('ingredients-search', 'get',
+             f'/api/ingredients/?name={ingredient.name[:6]}', False, None),
+            ('ingredients-detail', 'get',
+             f'/api/ingredients/{ingredient.id}/', False, None),
+            ('recipes-list-anonymous', 'get', '/api/recipes/', False, None),
+            ('recipes-list', 'get', '/api/recipes/', True, None),
+            ('recipes-list-limit-100', 'get', '/api/recipes/?limit=100',
+             True, None),
+            ('recipes-list-filtered', 'get',
+             f'/api/recipes/?is_favorited=1&tags={tag.slug}', True, None),
+            ('recipes-detail', 'get', f'/api/recipes/{marked}/', True, None),
+            ('recipes-create', 'post', '/api/recipes/', True, recipe_payload),
+            ('recipes-update', 'patch', f'/api/recipes/{own}/', True,
+             recipe_payload),
+            ('recipes-delete', 'delete', f'/api/recipes/{own}/', True, None),
+            ('recipes-get-link', 'get', f'/api/recipes/{free}/get-link/',
+             False, None),
+            ('short-link-redirect', 'get', link, False, None),
+            ('recipes-favorite-add', 'post',
+             f'/api/recipes/{free}/favorite/', True, None),
+            ('recipes-favorite-remove', 'delete',
+             f'/api/recipes/{marked}/favorite/', True, None),
+            ('recipes-shopping-cart-add', 'post',
+             f'/api/recipes/{free}/shopping_cart/', True, None),
+            ('recipes-shopping-cart-remove', 'delete',
+             f'/api/recipes/{marked}/shopping_cart/', True, None),
+            ('recipes-download-shopping-cart', 'get',
+             '/api/recipes/download_shopping_cart/', True, None),
+            ('users-list', 'get', '/api/users/', False, None),
+            ('users-detail', 'get', f'/api/users/{data["author"].id}/',
+             True, None),
+            ('users-me', 'get', '/api/users/me/', True, None),
+            ('users-create', 'post', '/api/users/', False, {
+                'email': 'benchmark-new@example.com',
+                'username': 'benchmark-new',
+                'first_name': 'Benchmark',
+                'last_name': 'New',
+                'password': 'Zx7!qLw93#vB',
+            }),
+            ('users-avatar-update', 'put', '/api/users/me/avatar/', True,
+             {'avatar': self.get_image()}),
+            ('users-avatar-delete', 'delete', '/api/users/me/avatar/', True,
+             None),
+            ('users-set-password', 'post', '/api/users/set_password/', True, {
+                'current_password': BENCHMARK_PASSWORD,
+                'new_password': 'Qm4#tRv82!kP',
+            }),
+            ('users-subscribe', 'post',
+             f'/api/users/{data["author"].id}/subscribe/', True, None),
+            ('users-unsubscribe', 'delete',
+             f'/api/users/{data["followed"].id}/subscribe/', True, None),
+            ('users-subscriptions', 'get',
+             '/api/users/subscriptions/?recipes_limit=3', True, None),
+            ('token-login', 'post', '/api/auth/token/login/', False, {
+                'email': data['viewer'].email,
+                'password': BENCHMARK_PASSWORD,
+            }),
+            ('token-logout', 'post', '/api/auth/token/logout/', True, None),
+        ]
+
+    def percentiles(self, timings):
+        timings = sorted(timings)
+        return {
+            'p50_ms': round(timings[len(timings) // 2] * 1000, 3),
+            'p95_ms': round(
+                timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+                * 1000, 3,
+            ),
+        }
+
+    def measure_connection(self, repeat):
+        """Время запроса SELECT 1 на новом и на открытом соединении."""
+        new, reused = [], []
+        for timings in (new, reused):
+            for _ in range(repeat):
+                if timings is new:
+                    connection.close()
+                start = time.perf_counter()
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                timings.append(time.perf_counter() - start)
+        return {
+            'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+            'new': self.percentiles(new),
+            'reused': self.percentiles(reused),
+        }
+
+    def measure(self, client, method, path, payload, repeat):
+        timings = []
+        for _ in range(repeat):
+            # Каждый запрос выполняется в точке сохранения и откатывается,
+            # чтобы все повторы работали с одинаковыми данными.
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    response = getattr(client, method)(
+                        path, payload, format='json',
+                    )
+                    if response.streaming:
+                        content = b''.join(response.streaming_content)
+                    else:
+                        content = response.content
+                    timings.append(time.perf_counter() - start)
+                transaction.set_rollback(True)
+        return {
+            'status': response.status_code,
+            'queries': len(queries),
+            **self.percentiles(timings),
+            'bytes': len(content),
+        }
+
+    def run(self, options):
+        data = self.seed(options)
+        client = APIClient()
+        client.get(f'/api/recipes/{data["marked_recipe"].id}/get-link/')
+        auth_client = APIClient()
+        auth_client.credentials(
+            HTTP_AUTHORIZATION=f'Token {data["token"].key}',
+        )
+        results = []
+        for name, method, path, auth, payload in self.get_endpoints(data):
+            result = self.measure(
+                auth_client if auth else client,
+                method, path, payload, options['repeat'],
+            )
+            results.append({
+                'name': name, 'method': method.upper(), 'path': path,
+                **result,
+            })
+        return results
+
+    def handle(self, *args, **options):
+        # Синтетические данные создаются через bulk_create, которому нужны
+        # первичные ключи созданных строк.
+        if connection.vendor != 'postgresql':
+            raise CommandError('Прогон поддерживается только в PostgreSQL.')
+        # Без CONN_MAX_AGE каждый запрос платит за открытие соединения,
+        # разница new и reused показывает эти накладные расходы.
+        connection_overhead = self.measure_connection(options['repeat'])
+        media_root = tempfile.mkdtemp()
+        # Ответы кешируются сразу, а версии моделей увеличиваются только
+        # после фиксации транзакции, которой нет. Поэтому прогон работает
+        # с отдельными кешами в памяти, иначе общий кеш отдавал бы
+        # синтетические данные после отката.
+        private_caches = {
+            alias: {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': f'benchmark-{alias}',
+            }
+            for alias in settings.CACHES
+        }
+        try:
+            with override_settings(ALLOWED_HOSTS=['*'],
+                                   MEDIA_ROOT=media_root,
+                                   CACHES=private_caches):
+                try:
+                    with transaction.atomic():
+                        results = self.run(options)
+                        raise Rollback
+                finally:
+                    for alias in caches:
+                        caches[alias].clear()
+        except Rollback:
+            pass
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+            short_link_cache.clear()
+            token_cache.clear()
+            ingredient_catalogue.invalidate()
+        report = json.dumps({
+            'dataset': {
+                key: options[key] for key in (
+                    'users', 'recipes', 'ingredients',
+                    'ingredients_per_recipe', 'favorites', 'follows',
+                    'repeat', 'seed',
+                )
+            },
+            'connection': connection_overhead,
+            'endpoints': results,
+            'short_link_cache': short_link_cache.stats(),
+            'token_cache': token_cache.stats(),
+        }, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(report)
+            self.stdout.write(self.style.SUCCESS(
+                f'Результат сохранен в {options["output"]}.'
+            ))
+        else:
+            self.stdout.write(report)
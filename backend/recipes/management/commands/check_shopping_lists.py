@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.models import ShoppingListItem
+from recipes.shopping_list import get_live_totals, rebuild_shopping_lists
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверка сохраненных списков покупок с агрегатом по рецептам '
+        'в корзинах.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix', action='store_true',
+            help='Пересобрать списки пользователей с расхождениями.',
+        )
+
+    def handle(self, *args, **options):
+        live = {
+            (user_id, ingredient_id): total_amount
+            for user_id, ingredient_id, total_amount
+            in get_live_totals().iterator()
+        }
+        broken = set()
+        for user_id, ingredient_id, total_amount in (
+            ShoppingListItem.objects.values_list(
+                'user_id', 'ingredient_id', 'total_amount',
+            ).iterator()
+        ):
+            if live.pop((user_id, ingredient_id), None) != total_amount:
+                broken.add(user_id)
+        broken.update(user_id for user_id, _ in live)
+        if not broken:
+            self.stdout.write(self.style.SUCCESS('Расхождений нет.'))
+            return
+        self.stdout.write(
+            f'Расхождения у пользователей ({len(broken)}): '
+            f'{", ".join(map(str, sorted(broken)))}'
+        )
+        if options['fix']:
+            with transaction.atomic():
+                rebuild_shopping_lists(broken)
+            self.stdout.write(self.style.SUCCESS('Списки пересобраны.'))
@@ -0,0 +1,235 @@
+import io
+import random
+import time
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
+                            ShoppingCart, Tag)
+from recipes.response_cache import bump_version
+from users.models import Follow
+
+User = get_user_model()
+
+GENERATED_IMAGE = 'recipes/images/generated.jpg'
+
+
+class ZipfSampler:
+    """Выбор элементов с вероятностью, обратной степени их ранга."""
+
+    def __init__(self, rnd, population, exponent):
+        self.rnd = rnd
+        self.population = population
+        self.cum_weights = list(accumulate(
+            1 / rank ** exponent for rank in range(1, len(population) + 1)
+        ))
+
+    def sample(self, k):
+        return self.rnd.choices(
+            self.population, cum_weights=self.cum_weights, k=k,
+        )
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерация синтетических пользователей, рецептов, избранного, '
+        'корзин и подписок для нагрузочного тестирования.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--recipes', type=int, default=100000)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--favorites', type=int, default=1000000)
+        parser.add_argument('--shopping-carts', type=int, default=200000)
+        parser.add_argument('--follows', type=int, default=200000)
+        parser.add_argument(
+            '--zipf-exponent', type=float, default=1.1,
+            help='Показатель распределения Ципфа для популярности авторов '
+                 'и рецептов, 0 — равномерное распределение.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument(
+            '--copy', action='store_true',
+            help='Загружать связующие таблицы через COPY (только '
+                 'PostgreSQL, таблицы не должны содержать конфликтующих '
+                 'строк).',
+        )
+
+    def insert(self, model, fields, rows):
+        """Пакетная вставка кортежей значений fields в таблицу model."""
+        batch_size = self.options['batch_size']
+        total = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                total += self.flush(model, fields, batch)
+                batch = []
+        if batch:
+            total += self.flush(model, fields, batch)
+        return total
+
+    def flush(self, model, fields, batch):
+        if not self.options['copy']:
+            model.objects.bulk_create(
+                (model(**dict(zip(fields, row))) for row in batch),
+                batch_size=len(batch),
+                ignore_conflicts=True,
+            )
+            return len(batch)
+        buffer = io.StringIO()
+        for row in batch:
+            buffer.write('\t'.join(map(str, row)) + '\n')
+        buffer.seek(0)
+        columns = ', '.join(
+            connection.ops.quote_name(model._meta.get_field(field).column)
+            for field in fields
+        )
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {connection.ops.quote_name(model._meta.db_table)} '
+                f'({columns}) FROM STDIN',
+                buffer,
+            )
+        return len(batch)
+
+    def per_owner(self, owners, total):
+        """Количество записей на каждого владельца, в сумме около total."""
+        mean = total / len(owners)
+        for owner in owners:
+            yield owner, round(self.rnd.expovariate(1 / mean)) if mean else 0
+
+    def create_users(self):
+        prefix = f'generated{self.options["seed"]}-'
+        users = [
+            User(
+                email=f'{prefix}{i}@example.com',
+                username=f'{prefix}{i}',
+                first_name='Generated',
+                last_name=str(i),
+                password='!',
+            )
+            for i in range(self.options['users'])
+        ]
+        return [
+            user.id for user in User.objects.bulk_create(
+                users, batch_size=self.options['batch_size'],
+            )
+        ]
+
+    def create_recipes(self, user_ids):
+        authors = ZipfSampler(
+            self.rnd, user_ids, self.options['zipf_exponent'],
+        ).sample(self.options['recipes'])
+        recipe_ids = []
+        batch_size = self.options['batch_size']
+        for start in range(0, len(authors), batch_size):
+            recipes = Recipe.objects.bulk_create(
+                Recipe(
+                    author_id=author_id,
+                    name=f'Рецепт {start + i}',
+                    image=GENERATED_IMAGE,
+                    text='Сгенерированный рецепт.',
+                    cooking_time=self.rnd.randint(1, 180),
+                )
+                for i, author_id in enumerate(
+                    authors[start:start + batch_size],
+                )
+            )
+            recipe_ids.extend(recipe.id for recipe in recipes)
+        return recipe_ids
+
+    def recipe_tags(self, recipe_ids, tag_ids):
+        for recipe_id in recipe_ids:
+            for tag_id in self.rnd.sample(
+                tag_ids, self.rnd.randint(1, len(tag_ids)),
+            ):
+                yield recipe_id, tag_id
+
+    def recipe_ingredients(self, recipe_ids, ingredient_ids):
+        per_recipe = min(
+            self.options['ingredients_per_recipe'], len(ingredient_ids),
+        )
+        for recipe_id in recipe_ids:
+            for ingredient_id in self.rnd.sample(ingredient_ids, per_recipe):
+                yield recipe_id, ingredient_id, self.rnd.randint(1, 1000)
+
+    def pairs(self, owners, targets, total, exclude_self=False):
+        """Уникальные пары (владелец, цель) с популярными целями по Ципфу."""
+        sampler = ZipfSampler(self.rnd, targets, self.options['zipf_exponent'])
+        for owner, count in self.per_owner(owners, total):
+            chosen = set(sampler.sample(min(count, len(targets))))
+            if exclude_self:
+                chosen.discard(owner)
+            for target in chosen:
+                yield owner, target
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.rnd = random.Random(options['seed'])
+        if options['copy'] and connection.vendor != 'postgresql':
+            raise CommandError('COPY поддерживается только в PostgreSQL.')
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        if not ingredient_ids:
+            raise CommandError(
+                'Сначала загрузите ингредиенты командой load_data.'
+            )
+        start = time.perf_counter()
+        with transaction.atomic():
+            tag_ids = list(Tag.objects.values_list('id', flat=True)) or [
+                tag.id for tag in Tag.objects.bulk_create(
+                    Tag(name=name, slug=slug) for name, slug in (
+                        ('Завтрак', 'breakfast'),
+                        ('Обед', 'lunch'),
+                        ('Ужин', 'dinner'),
+                    )
+                )
+            ]
+            user_ids = self.create_users()
+            self.stdout.write(f'Пользователи: {len(user_ids)}')
+            recipe_ids = self.create_recipes(user_ids)
+            self.stdout.write(f'Рецепты: {len(recipe_ids)}')
+            counts = {
+                'Теги рецептов': self.insert(
+                    Recipe.tags.through, ('recipe_id', 'tag_id'),
+                    self.recipe_tags(recipe_ids, tag_ids),
+                ),
+                'Ингредиенты рецептов': self.insert(
+                    IngredientInRecipe,
+                    ('recipe_id', 'ingredient_id', 'amount'),
+                    self.recipe_ingredients(recipe_ids, ingredient_ids),
+                ),
+                'Избранное': self.insert(
+                    Favorite, ('user_id', 'recipe_id'),
+                    self.pairs(user_ids, recipe_ids, options['favorites']),
+                ),
+                'Списки покупок': self.insert(
+                    ShoppingCart, ('user_id', 'recipe_id'),
+                    self.pairs(
+                        user_ids, recipe_ids, options['shopping_carts'],
+                    ),
+                ),
+                'Подписки': self.insert(
+                    Follow, ('user_id', 'following_id'),
+                    self.pairs(
+                        user_ids, user_ids, options['follows'],
+                        exclude_self=True,
+                    ),
+                ),
+            }
+            for name, count in counts.items():
+                self.stdout.write(f'{name}: {count}')
+            # Пакетная вставка не вызывает сигналы, обновляющие счетчики.
+            call_command('recount', stdout=self.stdout)
+            call_command('check_shopping_lists', fix=True, stdout=self.stdout)
+            for model in (Recipe, Tag, IngredientInRecipe, Favorite, User):
+                bump_version(model._meta.label_lower)
+        self.stdout.write(self.style.SUCCESS(
+            f'Данные сгенерированы за {time.perf_counter() - start:.1f} с.'
+        ))
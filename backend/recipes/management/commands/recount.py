@@ -0,0 +1,19 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.counters import recount
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчет счетчиков избранного, списков покупок и рецептов '
+        'автора по фактическим данным.'
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            fixed = recount(apps)
+        for counter, rows in fixed.items():
+            self.stdout.write(f'{counter}: исправлено строк {rows}')
+        self.stdout.write(self.style.SUCCESS('Счетчики пересчитаны.'))
@@ -0,0 +1,46 @@
+# Generated by Django 3.2 on 2026-10-18 19:24
+
+from string import ascii_letters, digits
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Копия recipes.utils.encode_short_link на момент миграции, чтобы ее
+# результат не зависел от последующих правок кода.
+SHORT_LINK_ALPHABET = digits + ascii_letters
+
+
+def encode_short_link(pk, min_length):
+    base = len(SHORT_LINK_ALPHABET)
+    number = pk + base ** (min_length - 1)
+    link = ''
+    while number:
+        number, remainder = divmod(number, base)
+        link = SHORT_LINK_ALPHABET[remainder] + link
+    return link
+
+
+def backfill_short_links(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    recipes = list(Recipe.objects.filter(short_link__isnull=True).only('id'))
+    for recipe in recipes:
+        recipe.short_link = encode_short_link(
+            recipe.id, settings.SHORT_LINK_MIN_LENGTH,
+        )
+    Recipe.objects.bulk_update(recipes, ['short_link'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_ingredient_unique_unit'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='short_link',
+            field=models.CharField(blank=True, max_length=11, null=True, unique=True, verbose_name='Короткая ссылка на рецепт'),
+        ),
+        migrations.RunPython(backfill_short_links, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_short_link_encoder'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        # Выражение совпадает с тем, что Django строит для icontains и
+        # istartswith в PostgreSQL, поэтому оба поиска идут по индексу.
+        migrations.RunSQL(
+            'CREATE INDEX recipes_ingredient_name_trgm '
+            'ON recipes_ingredient USING gin '
+            '(UPPER(name::text) gin_trgm_ops);',
+            'DROP INDEX recipes_ingredient_name_trgm;',
+        ),
+    ]
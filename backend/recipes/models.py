@@ -1,6 +1,7 @@
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models import Exists, OuterRef, Prefetch, Value
 
 from .constants import (MAX_LENGTH_INGREDIENT_NAME,
                         MAX_LENGTH_MEASUREMENT_UNIT, MAX_LENGTH_RECIPE_NAME,
@@ -57,6 +58,47 @@ class Ingredient(models.Model):
         return f'{self.name} ({self.measurement_unit})'
 
 
+class RecipeQuerySet(models.QuerySet):
+    """Кверисет рецептов с подготовкой данных для чтения."""
+
+    def with_user_flags(self, user):
+        """Аннотирует рецепты флагами избранного и корзины пользователя."""
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=Value(False),
+                is_in_shopping_cart=Value(False),
+            )
+        return self.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk'),
+            )),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk'),
+            )),
+        )
+
+    def with_author(self, user):
+        """Подгружает авторов вместе с признаком подписки на них."""
+        if not user.is_authenticated:
+            return self.select_related('author')
+        return self.prefetch_related(Prefetch(
+            'author', queryset=User.objects.with_is_subscribed(user),
+        ))
+
+    def for_read(self, user):
+        """Все данные для RecipeListSerializer за фиксированное число
+        запросов, независимо от количества рецептов."""
+        return self.with_user_flags(user).with_author(user).prefetch_related(
+            'tags',
+            Prefetch(
+                'ingredient_recipe',
+                queryset=IngredientInRecipe.objects.select_related(
+                    'ingredient',
+                ),
+            ),
+        )
+
+
 class Recipe(models.Model):
     """Модель рецептов."""
 
@@ -83,6 +125,12 @@ class Recipe(models.Model):
         upload_to='recipes/images/',
         verbose_name='Картинка',
     )
+    thumbnail = models.ImageField(
+        upload_to='recipes/thumbnails/',
+        verbose_name='Миниатюра',
+        blank=True,
+        editable=False,
+    )
     text = models.TextField(verbose_name='Описание')
     cooking_time = models.PositiveIntegerField(
         verbose_name='Время приготовления',
@@ -91,26 +139,38 @@ class Recipe(models.Model):
     pub_date = models.DateTimeField(
         verbose_name='Дата добавления', auto_now_add=True,
     )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения', auto_now=True,
+    )
     short_link = models.CharField(
         max_length=MAX_LENGTH_SHORT_LINK,
         verbose_name='Короткая ссылка на рецепт',
         null=True, blank=True,
         unique=True,
     )
+    favorites_count = models.PositiveIntegerField(
+        'Добавили в избранное', default=0, editable=False,
+    )
+    in_carts_count = models.PositiveIntegerField(
+        'Добавили в список покупок', default=0, editable=False,
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(fields=('-pub_date', '-id'),
+                         name='recipe_newest_idx'),
+            models.Index(fields=('-favorites_count', '-id'),
+                         name='recipe_popular_idx'),
+        ]
 
     def __str__(self):
         return f'{self.name} от автора {self.author}'
 
-    def favorite_count(self):
-        return self.favorited_user.count()
-
-    favorite_count.short_description = 'Добавили в избранное'
-
 
 class IngredientInRecipe(models.Model):
     """Промежуточная модель ингредиентов в рецепте."""
@@ -192,3 +252,37 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return f'{self.recipe} в корзине {self.user}'
+
+
+class ShoppingListItem(models.Model):
+    """Итоговое количество ингредиента в списке покупок пользователя.
+
+    Поддерживается при добавлении и удалении рецептов из корзины и при
+    изменении ингредиентов рецептов, чтобы выгрузка списка покупок
+    читала готовые строки вместо агрегации.
+    """
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        verbose_name='Пользователь',
+        related_name='shopping_list',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient, on_delete=models.CASCADE,
+        verbose_name='Ингредиент',
+        related_name='shopping_list_items',
+    )
+    total_amount = models.PositiveIntegerField(
+        verbose_name='Количество',
+    )
+
+    class Meta:
+        verbose_name = 'строка списка покупок'
+        verbose_name_plural = 'Строки списков покупок'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'ingredient'],
+                                    name='unique_shopping_list_item'),
+        ]
+
+    def __str__(self):
+        return f'{self.ingredient} — {self.total_amount} у {self.user}'
@@ -1,7 +1,225 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from recipes.constants import RECIPE_ORDERINGS
+
+
+def get_recipe_ordering(request):
+    """Порядок рецептов из параметра ordering, по умолчанию новые."""
+    return RECIPE_ORDERINGS.get(
+        request.query_params.get('ordering'), RECIPE_ORDERINGS['newest'],
+    )
+
+
+def get_table_estimate(queryset):
+    """Оценка числа строк таблицы из статистики PostgreSQL."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [queryset.model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def get_count(queryset):
+    """Количество объектов и признак того, что оно приблизительное.
+
+    Для списка без фильтров берется оценка PostgreSQL, если таблица
+    достаточно большая. Для отфильтрованного списка точное значение
+    кешируется по тексту запроса на COUNT_CACHE_TTL секунд.
+    """
+    queryset = queryset.order_by().values('pk')
+    if not queryset.query.where:
+        estimate = get_table_estimate(queryset)
+        if estimate is not None and estimate >= settings.COUNT_ESTIMATE_MIN:
+            return estimate, True
+        return queryset.count(), False
+    sql, params = queryset.query.sql_with_params()
+    key = 'count:' + hashlib.md5(
+        f'{sql}{params}'.encode(),
+    ).hexdigest()
+    count = cache.get(key)
+    if count is not None:
+        return count, True
+    count = queryset.count()
+    cache.set(key, count, settings.COUNT_CACHE_TTL)
+    return count, False
+
+
+class ApproximatePage(Page):
+    """Страница, наличие следующей у которой известно из выборки."""
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+
+class ApproximateCountPaginator(Paginator):
+    """Пагинатор Django с приблизительным подсчетом объектов.
+
+    Количество только выводится в ответе. Существование страницы и наличие
+    следующей определяются выборкой на один объект больше размера
+    страницы, поэтому заниженная оценка не скрывает последние страницы.
+    """
+
+    @cached_property
+    def count(self):
+        count, self.count_is_approximate = get_count(self.object_list)
+        return count
+
+    def page(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('Номер страницы должен быть целым числом.')
+        if number < 1:
+            raise EmptyPage('Номер страницы меньше 1.')
+        bottom = (number - 1) * self.per_page
+        objects = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not objects and number > 1:
+            raise EmptyPage('На странице нет результатов.')
+        return ApproximatePage(
+            objects[:self.per_page], number, self,
+            has_next=len(objects) > self.per_page,
+        )
 
 
 class RecipePagination(PageNumberPagination):
     """Кастомный пагинатор для списка рецептов."""
 
     page_size_query_param = 'limit'
+    django_paginator_class = ApproximateCountPaginator
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data['count_is_approximate'] = (
+            self.page.paginator.count_is_approximate
+        )
+        return response
+
+
+class RecipeKeysetPagination(BasePagination):
+    """Пагинация по ключу (значение поля сортировки, id) без OFFSET.
+
+    Курсор хранит ключ последнего рецепта страницы, поэтому стоимость
+    запроса не зависит от глубины страницы. Общее количество считается
+    только по запросу с параметром count=true и может быть приблизительным.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            value, pk = json.loads(base64.urlsafe_b64decode(cursor))
+        except (TypeError, ValueError):
+            raise NotFound('Некорректный курсор.')
+        # bool — подкласс int, поэтому типы сравниваются точно.
+        if type(pk) is not int or type(value) not in (int, str):
+            raise NotFound('Некорректный курсор.')
+        return value, pk
+
+    def encode_cursor(self, instance):
+        value = getattr(instance, self.field)
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        return base64.urlsafe_b64encode(
+            json.dumps([value, instance.pk]).encode(),
+        ).decode()
+
+    def filter_after(self, queryset, value, pk):
+        """Рецепты после курсора в порядке убывания (поле, id).
+
+        Условие записывается сравнением строк, а не через OR: тогда
+        PostgreSQL использует его как условие поиска по индексу сортировки
+        и не просматривает пропущенные строки.
+        """
+        opts = queryset.model._meta
+        field = opts.get_field(self.field)
+        try:
+            value = field.get_prep_value(field.to_python(value))
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound('Некорректный курсор.')
+        quote = connections[queryset.db].ops.quote_name
+        table = quote(opts.db_table)
+        return queryset.extra(
+            where=[
+                f'({table}.{quote(field.column)}, '
+                f'{table}.{quote(opts.pk.column)}) < (%s, %s)',
+            ],
+            params=[value, pk],
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        ordering = get_recipe_ordering(request)
+        self.field = ordering[0].lstrip('-')
+        queryset = queryset.order_by(*ordering)
+        self.count = None
+        if request.query_params.get('count') == 'true':
+            self.count, self.count_is_approximate = get_count(queryset)
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            queryset = self.filter_after(queryset, *cursor)
+        page_size = self.get_page_size(request)
+        results = list(queryset[:page_size + 1])
+        self.page = results[:page_size]
+        self.has_next = len(results) > page_size
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.page[-1]),
+        )
+
+    def get_paginated_response(self, data):
+        response = {'next': self.get_next_link(), 'results': data}
+        if self.count is not None:
+            response = {
+                'count': self.count,
+                'count_is_approximate': self.count_is_approximate,
+                **response,
+            }
+        return Response(response)
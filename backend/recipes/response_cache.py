@@ -0,0 +1,165 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+
+def get_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def version_key(label):
+    return f'version:{label}'
+
+
+def now_version():
+    return time.time_ns() // 1000
+
+
+def bump_version(label):
+    """Обновляет версию модели после фиксации текущей транзакции.
+
+    Версия — время последнего изменения в микросекундах, поэтому по ней
+    же строится заголовок Last-Modified.
+    """
+
+    def bump():
+        cache = get_cache()
+        key = version_key(label)
+        cache.set(key, max(now_version(), cache.get(key, 0) + 1), None)
+
+    transaction.on_commit(bump)
+
+
+def get_versions(labels):
+    """Текущие версии моделей, отсутствующие создаются."""
+    cache = get_cache()
+    keys = [version_key(label) for label in labels]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, now_version(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def get_validators(request, fingerprint, user_pk=None):
+    """ETag и Last-Modified по меткам времени изменений fingerprint."""
+    etag = '"{}"'.format(hashlib.md5(':'.join((
+        request.get_full_path(),
+        request.META.get('HTTP_ACCEPT', ''),
+        str(user_pk),
+        *map(str, fingerprint),
+    )).encode()).hexdigest())
+    return etag, max(fingerprint) // 10 ** 6
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+class VersionedViewMixin:
+    """Список моделей, от которых зависят ответы вьюсета.
+
+    cache_models влияют на ответ любому пользователю, user_cache_models —
+    только своему владельцу, их версии хранятся отдельно для каждого
+    пользователя.
+    """
+
+    cache_models = ()
+    user_cache_models = ()
+
+    def get_cache_models(self):
+        return self.cache_models
+
+    def get_version_labels(self):
+        labels = list(self.get_cache_models())
+        user = self.request.user
+        if user.is_authenticated:
+            labels.extend(
+                f'{label}:{user.pk}' for label in self.user_cache_models
+            )
+        return labels
+
+
+class AnonymousCacheMixin(VersionedViewMixin):
+    """Кеширование данных ответов list и retrieve для анонимных запросов.
+
+    Ключ включает полный адрес запроса (схему, хост, путь и параметры) и
+    версии моделей из cache_models, поэтому изменение любой из них делает
+    старые записи недоступными.
+    """
+
+    def get_cache_key(self, request):
+        versions = get_versions(self.get_cache_models())
+        # Ссылки на картинки и соседние страницы в ответе абсолютные.
+        path = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+        return (
+            f'response:{self.basename}:{self.action}:{path}:'
+            f'{":".join(map(str, versions))}'
+        )
+
+    def cached(self, handler, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+        cache = get_cache()
+        key = self.get_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = handler(request, *args, **kwargs)
+        if (
+            isinstance(response, Response)
+            and response.status_code == 200
+        ):
+            cache.set(key, response.data, settings.RESPONSE_CACHE_TTL)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached(super().retrieve, request, *args, **kwargs)
+
+
+class ConditionalGetMixin(VersionedViewMixin):
+    """Заголовки ETag и Last-Modified для list и retrieve.
+
+    Валидаторы строятся по версиям моделей до обращения к базе, поэтому
+    на совпавший If-None-Match или If-Modified-Since ответ 304 отдается
+    без выборки и сериализации данных.
+    """
+
+    def get_fingerprint(self):
+        """Метки времени изменений в микросекундах, от которых зависит
+        ответ, или None, если валидаторы построить нельзя."""
+        return get_versions(self.get_version_labels())
+
+    def conditional(self, handler, request, *args, **kwargs):
+        fingerprint = self.get_fingerprint()
+        if not fingerprint:
+            return handler(request, *args, **kwargs)
+        etag, last_modified = get_validators(
+            request, fingerprint, request.user.pk,
+        )
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified,
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        return set_validators(response, etag, last_modified)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(super().retrieve, request, *args, **kwargs)
@@ -1,8 +1,10 @@
 from django.core.validators import MinValueValidator
+from django.db import transaction
 from rest_framework import serializers
 
 from recipes.constants import MIN_AMOUNT
 from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
+from recipes.shopping_list import change_ingredient_amount
 from users.serializers import Base64ImageField, UserSerializer
 
 
@@ -32,13 +34,70 @@ class IngredientInRecipeSerializer(serializers.ModelSerializer):
         )
 
 
+def get_objects_in_bulk(queryset, pks, message):
+    """Объекты queryset в порядке pks, загруженные одним запросом.
+
+    Все отсутствующие pk перечисляются в одной ошибке валидации.
+    """
+    objects = queryset.in_bulk(set(pks))
+    missing = [pk for pk in dict.fromkeys(pks) if pk not in objects]
+    if missing:
+        raise serializers.ValidationError(
+            message.format(ids=', '.join(map(str, missing))),
+        )
+    return [objects[pk] for pk in pks]
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """Список первичных ключей, проверяемый одним запросом."""
+
+    default_error_messages = {
+        'does_not_exist': 'Объекты не найдены: {ids}.',
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        pks = []
+        for item in data:
+            if isinstance(item, bool):
+                self.child_relation.fail(
+                    'incorrect_type', data_type=type(item).__name__,
+                )
+            try:
+                pks.append(int(item))
+            except (TypeError, ValueError):
+                self.child_relation.fail(
+                    'incorrect_type', data_type=type(item).__name__,
+                )
+        return get_objects_in_bulk(
+            self.child_relation.get_queryset(), pks,
+            self.error_messages['does_not_exist'],
+        )
+
+
+class IngredientInRecipeListSerializer(serializers.ListSerializer):
+    """Список ингредиентов рецепта, загружаемых одним запросом."""
+
+    def to_internal_value(self, data):
+        items = super().to_internal_value(data)
+        ingredients = get_objects_in_bulk(
+            Ingredient.objects.all(),
+            [item['id'] for item in items],
+            'Ингредиенты не найдены: {ids}.',
+        )
+        for item, ingredient in zip(items, ingredients):
+            item['id'] = ingredient
+        return items
+
+
 class CreateUpdateIngredientInRecipeSerializer(serializers.ModelSerializer):
     """Сериализатор создания и обновления ингредиентов в рецепте."""
 
     recipe = serializers.PrimaryKeyRelatedField(read_only=True)
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all()
-    )
+    id = serializers.IntegerField()
     amount = serializers.IntegerField(
         write_only=True,
         validators=(MinValueValidator(MIN_AMOUNT),),
@@ -49,6 +108,7 @@ class CreateUpdateIngredientInRecipeSerializer(serializers.ModelSerializer):
         fields = (
             'id', 'recipe', 'amount',
         )
+        list_serializer_class = IngredientInRecipeListSerializer
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -81,13 +141,27 @@ class RecipeListSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart', 'name', 'image', 'text', 'cooking_time',
         )
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        view = self.context.get('view')
+        # В списках показывается миниатюра, на странице рецепта — оригинал.
+        if view is not None and view.action == 'list' and instance.thumbnail:
+            data['image'] = self.fields['image'].to_representation(
+                instance.thumbnail,
+            )
+        return data
+
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context['request'].user
         if user.is_authenticated:
             return user.favorite_recipes.filter(recipe_id=obj.id).exists()
         return False
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context['request'].user
         if user.is_authenticated:
             return user.in_shopping_cart.filter(recipe_id=obj.id).exists()
@@ -97,9 +171,11 @@ class RecipeListSerializer(serializers.ModelSerializer):
 class RecipeCreateSerializer(RecipeListSerializer):
     """Сериализатор создания и обновления рецептов."""
 
-    tags = serializers.PrimaryKeyRelatedField(
-        many=True,
-        queryset=Tag.objects.all(),
+    tags = BulkManyRelatedField(
+        child_relation=serializers.PrimaryKeyRelatedField(
+            queryset=Tag.objects.all(),
+        ),
+        error_messages={'does_not_exist': 'Теги не найдены: {ids}.'},
     )
     ingredients = CreateUpdateIngredientInRecipeSerializer(many=True)
 
@@ -148,6 +224,48 @@ class RecipeCreateSerializer(RecipeListSerializer):
             ingredients_list,
         )
 
+    def _update_ingredients(self, recipe, ingredients):
+        """Приводит ингредиенты рецепта к переданным, изменяя только
+        отличающиеся строки."""
+        existing = {
+            item.ingredient_id: item
+            for item in recipe.ingredient_recipe.all()
+        }
+        amounts = {
+            ingredient['id'].id: ingredient['amount']
+            for ingredient in ingredients
+        }
+        to_create = [
+            ingredient for ingredient in ingredients
+            if ingredient['id'].id not in existing
+        ]
+        to_update = []
+        # Пакетные операции не вызывают сигналы, поэтому списки покупок
+        # для измененных и добавленных строк обновляются здесь.
+        deltas = [
+            (ingredient['id'].id, ingredient['amount'])
+            for ingredient in to_create
+        ]
+        for ingredient_id, item in existing.items():
+            amount = amounts.get(ingredient_id)
+            if amount is not None and amount != item.amount:
+                deltas.append((ingredient_id, amount - item.amount))
+                item.amount = amount
+                to_update.append(item)
+        to_delete = [
+            item.id for ingredient_id, item in existing.items()
+            if ingredient_id not in amounts
+        ]
+        if to_delete:
+            IngredientInRecipe.objects.filter(id__in=to_delete).delete()
+        if to_update:
+            IngredientInRecipe.objects.bulk_update(to_update, ('amount',))
+        if to_create:
+            self._create_ingredients(recipe, to_create)
+        for ingredient_id, delta in deltas:
+            change_ingredient_amount(recipe.pk, ingredient_id, delta)
+
+    @transaction.atomic
     def create(self, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
@@ -156,16 +274,23 @@ class RecipeCreateSerializer(RecipeListSerializer):
         recipe.tags.set(tags)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
-        instance.ingredients.clear()
-        self._create_ingredients(instance, ingredients)
+        if 'image' in validated_data:
+            # Новая картинка перекодируется и получает миниатюру в фоне
+            # после сохранения, до тех пор в списках видна исходная.
+            validated_data['thumbnail'] = ''
+        self._update_ingredients(instance, ingredients)
+        # set() сам сравнивает теги с текущими и меняет только разницу.
         instance.tags.set(tags)
         return super().update(instance, validated_data)
 
     def to_representation(self, instance):
         return RecipeListSerializer(
-            instance,
+            Recipe.objects.for_read(
+                self.context['request'].user,
+            ).get(pk=instance.pk),
             context=self.context,
         ).data
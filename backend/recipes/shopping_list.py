@@ -0,0 +1,186 @@
+import csv
+import io
+import os
+
+from django.conf import settings
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Greatest
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from recipes.constants import PDF_CHUNK_SIZE
+from recipes.models import IngredientInRecipe, ShoppingCart, ShoppingListItem
+
+PDF_FONT_NAME = 'ShoppingListFont'
+
+
+def get_live_totals(user_ids=None):
+    """Суммы ингредиентов по рецептам в корзинах: (user_id, ingredient_id,
+    total_amount), посчитанные напрямую по IngredientInRecipe."""
+    # Условия на корзину задаются одним filter(), иначе каждое из них
+    # добавит отдельный JOIN и суммы умножатся.
+    if user_ids is None:
+        lookup = {'recipe__in_shopping_cart__isnull': False}
+    else:
+        lookup = {'recipe__in_shopping_cart__user_id__in': user_ids}
+    return IngredientInRecipe.objects.filter(**lookup).values_list(
+        'recipe__in_shopping_cart__user_id', 'ingredient_id',
+    ).annotate(
+        total_amount=Sum('amount'),
+    ).order_by()
+
+
+def change_shopping_list(user_id, recipe_id, sign):
+    """Прибавляет (sign=1) или вычитает (sign=-1) ингредиенты рецепта."""
+    recipe_ingredients = IngredientInRecipe.objects.filter(
+        recipe_id=recipe_id,
+    )
+    amount = Subquery(recipe_ingredients.filter(
+        ingredient=OuterRef('ingredient'),
+    ).values('amount'))
+    items = ShoppingListItem.objects.filter(
+        user_id=user_id,
+        ingredient__in=recipe_ingredients.values('ingredient'),
+    )
+    if sign > 0:
+        ShoppingListItem.objects.bulk_create(
+            (
+                ShoppingListItem(
+                    user_id=user_id, ingredient_id=ingredient_id,
+                    total_amount=0,
+                )
+                for ingredient_id in recipe_ingredients.values_list(
+                    'ingredient_id', flat=True,
+                )
+            ),
+            ignore_conflicts=True,
+        )
+        items.update(total_amount=F('total_amount') + amount)
+    else:
+        items.update(
+            total_amount=Greatest(F('total_amount') - amount, Value(0)),
+        )
+        ShoppingListItem.objects.filter(
+            user_id=user_id, total_amount=0,
+        ).delete()
+
+
+def add_to_shopping_list(user_id, recipe_id):
+    change_shopping_list(user_id, recipe_id, 1)
+
+
+def remove_from_shopping_list(user_id, recipe_id):
+    change_shopping_list(user_id, recipe_id, -1)
+
+
+def change_ingredient_amount(recipe_id, ingredient_id, delta):
+    """Меняет количество ингредиента на delta в списках покупок всех
+    пользователей, у которых рецепт в корзине."""
+    if not delta:
+        return
+    user_ids = ShoppingCart.objects.filter(
+        recipe_id=recipe_id,
+    ).values('user_id')
+    items = ShoppingListItem.objects.filter(
+        user_id__in=user_ids, ingredient_id=ingredient_id,
+    )
+    if delta > 0:
+        ShoppingListItem.objects.bulk_create(
+            (
+                ShoppingListItem(
+                    user_id=user_id, ingredient_id=ingredient_id,
+                    total_amount=0,
+                )
+                for user_id in user_ids.values_list('user_id', flat=True)
+            ),
+            ignore_conflicts=True,
+        )
+        items.update(total_amount=F('total_amount') + delta)
+    else:
+        items.update(
+            total_amount=Greatest(F('total_amount') + delta, Value(0)),
+        )
+        items.filter(total_amount=0).delete()
+
+
+def rebuild_shopping_lists(user_ids):
+    """Пересобирает списки покупок пользователей по рецептам в корзинах."""
+    user_ids = list(user_ids)
+    ShoppingListItem.objects.filter(user_id__in=user_ids).delete()
+    ShoppingListItem.objects.bulk_create(
+        ShoppingListItem(
+            user_id=user_id, ingredient_id=ingredient_id,
+            total_amount=total_amount,
+        )
+        for user_id, ingredient_id, total_amount in get_live_totals(user_ids)
+    )
+
+
+class Echo:
+    """Псевдофайл, возвращающий записанную строку вместо ее сохранения."""
+
+    def write(self, value):
+        return value
+
+
+def render_txt(ingredients):
+    for name, measurement_unit, amount in ingredients:
+        yield f'{name} ({measurement_unit}) — {amount}\n'
+
+
+def render_csv(ingredients):
+    writer = csv.writer(Echo())
+    # BOM нужен, чтобы Excel распознал кириллицу в UTF-8.
+    yield '\ufeff' + writer.writerow(
+        ('Ингредиент', 'Единица измерения', 'Количество'),
+    )
+    for row in ingredients:
+        yield writer.writerow(row)
+
+
+def get_pdf_font():
+    if PDF_FONT_NAME in pdfmetrics.getRegisteredFontNames():
+        return PDF_FONT_NAME
+    if not os.path.exists(settings.SHOPPING_LIST_PDF_FONT):
+        return 'Helvetica'
+    pdfmetrics.registerFont(
+        TTFont(PDF_FONT_NAME, settings.SHOPPING_LIST_PDF_FONT),
+    )
+    return PDF_FONT_NAME
+
+
+def render_pdf(ingredients):
+    # PDF ссылается на смещения объектов в конце файла, поэтому документ
+    # собирается целиком и отдается частями.
+    buffer = io.BytesIO()
+    font = get_pdf_font()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4
+    top = height - 20 * mm
+    pdf.setFont(font, 16)
+    pdf.drawString(20 * mm, top, 'Список покупок')
+    y = top - 12 * mm
+    for name, measurement_unit, amount in ingredients:
+        if y < 20 * mm:
+            pdf.showPage()
+            y = top
+        pdf.setFont(font, 12)
+        pdf.drawString(20 * mm, y, f'{name} ({measurement_unit}) — {amount}')
+        y -= 7 * mm
+    pdf.save()
+    buffer.seek(0)
+    while True:
+        chunk = buffer.read(PDF_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+
+SHOPPING_LIST_FORMATS = {
+    'txt': ('text/plain; charset=utf-8', render_txt),
+    'csv': ('text/csv; charset=utf-8', render_csv),
+    'pdf': ('application/pdf', render_pdf),
+}
@@ -0,0 +1,182 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+
+from recipes.cache import short_link_cache
+from recipes.catalogue import ingredient_catalogue
+from recipes.counters import change_counter
+from recipes.images import process_recipe_image, schedule_image_processing
+from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
+                            ShoppingCart, Tag)
+from recipes.response_cache import bump_version
+from recipes.shopping_list import (add_to_shopping_list,
+                                   change_ingredient_amount,
+                                   remove_from_shopping_list)
+from users.models import CustomUser, Follow
+
+
+@receiver(post_delete, sender=Recipe)
+def invalidate_short_link(sender, instance, **kwargs):
+    if instance.short_link:
+        short_link_cache.delete(instance.short_link)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient_catalogue(sender, **kwargs):
+    ingredient_catalogue.invalidate()
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=IngredientInRecipe)
+@receiver(post_delete, sender=IngredientInRecipe)
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+def bump_model_version(sender, **kwargs):
+    bump_version(sender._meta.label_lower)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def bump_user_relation_version(sender, instance, **kwargs):
+    bump_version(f'{sender._meta.label_lower}:{instance.user_id}')
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def bump_recipe_relations_version(sender, action, **kwargs):
+    if action.startswith('post_'):
+        bump_version(Recipe._meta.label_lower)
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def bump_user_version(sender, update_fields=None, **kwargs):
+    # Время входа не попадает в ответы API.
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    bump_version(sender._meta.label_lower)
+
+
+@receiver(pre_save, sender=Recipe)
+def remember_image_upload(sender, instance, **kwargs):
+    # Новый файл записывается в хранилище уже после этого сигнала.
+    instance._image_uploaded = (
+        bool(instance.image) and not instance.image._committed
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def process_image(sender, instance, **kwargs):
+    uploaded = instance.__dict__.pop('_image_uploaded', False)
+    if instance.image and (uploaded or not instance.thumbnail):
+        schedule_image_processing(
+            process_recipe_image, instance.pk, instance.image.name,
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def increment_recipes_count(sender, instance, created, **kwargs):
+    if created:
+        change_counter(CustomUser, instance.author_id, 'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipes_count(sender, instance, **kwargs):
+    change_counter(CustomUser, instance.author_id, 'recipes_count', -1)
+
+
+@receiver(pre_save, sender=Favorite)
+@receiver(pre_save, sender=ShoppingCart)
+def remember_user_recipe(sender, instance, **kwargs):
+    # В админке у существующей строки можно сменить пользователя и рецепт.
+    instance._saved_values = None
+    if not instance._state.adding:
+        instance._saved_values = sender.objects.filter(
+            pk=instance.pk,
+        ).values_list('user_id', 'recipe_id').first()
+
+
+def move_recipe_counter(instance, created, field):
+    saved = getattr(instance, '_saved_values', None)
+    if not created and (saved is None or saved[1] == instance.recipe_id):
+        return
+    if saved is not None:
+        change_counter(Recipe, saved[1], field, -1)
+    change_counter(Recipe, instance.recipe_id, field, 1)
+
+
+@receiver(post_save, sender=Favorite)
+def increment_favorites_count(sender, instance, created, **kwargs):
+    move_recipe_counter(instance, created, 'favorites_count')
+
+
+@receiver(post_delete, sender=Favorite)
+def decrement_favorites_count(sender, instance, **kwargs):
+    change_counter(Recipe, instance.recipe_id, 'favorites_count', -1)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def increment_in_carts_count(sender, instance, created, **kwargs):
+    move_recipe_counter(instance, created, 'in_carts_count')
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def decrement_in_carts_count(sender, instance, **kwargs):
+    change_counter(Recipe, instance.recipe_id, 'in_carts_count', -1)
+
+
+# Списки покупок меняются приращениями. Поэтому при каскадном удалении
+# рецепта неважно, что Django удалит раньше: его строки в корзинах или
+# его ингредиенты.
+@receiver(post_save, sender=ShoppingCart)
+def add_recipe_to_shopping_list(sender, instance, created, **kwargs):
+    saved = getattr(instance, '_saved_values', None)
+    if not created and saved in (None, (instance.user_id, instance.recipe_id)):
+        return
+    if saved is not None:
+        remove_from_shopping_list(*saved)
+    add_to_shopping_list(instance.user_id, instance.recipe_id)
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def remove_recipe_from_shopping_list(sender, instance, **kwargs):
+    remove_from_shopping_list(instance.user_id, instance.recipe_id)
+
+
+@receiver(pre_save, sender=IngredientInRecipe)
+def remember_recipe_ingredient(sender, instance, **kwargs):
+    instance._saved_values = None
+    if not instance._state.adding:
+        instance._saved_values = IngredientInRecipe.objects.filter(
+            pk=instance.pk,
+        ).values_list('recipe_id', 'ingredient_id', 'amount').first()
+
+
+@receiver(post_save, sender=IngredientInRecipe)
+def change_recipe_ingredient_in_shopping_lists(sender, instance, **kwargs):
+    saved = instance.__dict__.pop('_saved_values', None)
+    key = (instance.recipe_id, instance.ingredient_id)
+    if saved is not None and saved[:2] == key:
+        change_ingredient_amount(*key, instance.amount - saved[2])
+        return
+    if saved is not None:
+        recipe_id, ingredient_id, amount = saved
+        change_ingredient_amount(recipe_id, ingredient_id, -amount)
+    change_ingredient_amount(*key, instance.amount)
+
+
+@receiver(post_delete, sender=IngredientInRecipe)
+def remove_recipe_ingredient_from_shopping_lists(sender, instance, **kwargs):
+    change_ingredient_amount(
+        instance.recipe_id, instance.ingredient_id, -instance.amount,
+    )
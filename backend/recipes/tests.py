@@ -0,0 +1,707 @@
+import base64
+import csv
+import io
+import json
+import tempfile
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.async_views import ingredient_list, tag_list
+from recipes.cache import LRUCache, short_link_cache
+from recipes.catalogue import ingredient_catalogue
+from recipes.management.commands import benchmark
+from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
+                            ShoppingCart, ShoppingListItem, Tag)
+from recipes.shopping_list import get_live_totals
+from users.authentication import token_cache
+from users.models import CustomUser, Follow
+
+
+def get_image():
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8), 'white').save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue(),
+    ).decode()
+
+
+def create_user(number):
+    return CustomUser.objects.create_user(
+        email=f'user{number}@example.com',
+        username=f'user{number}',
+        password='password',
+        first_name='Имя',
+        last_name='Фамилия',
+    )
+
+
+class RecipeFixtureMixin:
+    """Рецепты нескольких авторов с тегами, ингредиентами и подписками."""
+
+    @classmethod
+    def create_recipes(cls, count, start=0):
+        recipes = []
+        for number in range(start, start + count):
+            recipe = Recipe.objects.create(
+                author=cls.authors[number % len(cls.authors)],
+                name=f'Рецепт {number}',
+                image='recipes/images/recipe.png',
+                thumbnail='recipes/thumbnails/recipe.png',
+                text='Описание',
+                cooking_time=10,
+            )
+            recipe.tags.set(cls.tags[:number % len(cls.tags) + 1])
+            IngredientInRecipe.objects.bulk_create(
+                IngredientInRecipe(
+                    recipe=recipe, ingredient=ingredient, amount=number + 1,
+                )
+                for ingredient in cls.ingredients[:number % 3 + 2]
+            )
+            recipes.append(recipe)
+        return recipes
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(0)
+        cls.authors = [create_user(number) for number in range(1, 4)]
+        cls.tags = [
+            Tag.objects.create(name=f'Тег {number}', slug=f'tag{number}')
+            for number in range(3)
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {number}', measurement_unit='г',
+            )
+            for number in range(5)
+        ]
+        cls.recipes = cls.create_recipes(12)
+        for recipe in cls.recipes[::2]:
+            Favorite.objects.create(user=cls.user, recipe=recipe)
+            ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+        Follow.objects.create(user=cls.user, following=cls.authors[0])
+        cls.token = Token.objects.create(user=cls.user)
+
+    def clear_caches(self):
+        for alias in caches:
+            caches[alias].clear()
+        token_cache.clear()
+
+    def setUp(self):
+        self.clear_caches()
+        self.guest_client = APIClient()
+        self.auth_client = APIClient()
+        self.auth_client.credentials(
+            HTTP_AUTHORIZATION=f'Token {self.token.key}',
+        )
+
+
+class RecipeReadQueriesTest(RecipeFixtureMixin, TestCase):
+    """Число запросов к базе при чтении рецептов не зависит от их
+    количества на странице."""
+
+    # Оценка и подсчет количества, рецепты с автором, теги, ингредиенты.
+    LIST_QUERIES = 5
+    # Дата изменения для ETag, рецепт с автором, теги, ингредиенты.
+    DETAIL_QUERIES = 4
+    # Токен при первом запросе пользователя и авторы с признаком подписки,
+    # который нельзя получить через select_related.
+    AUTH_QUERIES = 2
+
+    def assert_list_queries(self, client, queries):
+        for limit in (6, 12):
+            with self.subTest(limit=limit):
+                self.clear_caches()
+                with self.assertNumQueries(queries):
+                    response = client.get(f'/api/recipes/?limit={limit}')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data['results']), limit)
+
+    def test_list_guest(self):
+        self.assert_list_queries(self.guest_client, self.LIST_QUERIES)
+
+    def test_list_authenticated(self):
+        self.assert_list_queries(
+            self.auth_client, self.LIST_QUERIES + self.AUTH_QUERIES,
+        )
+
+    def test_retrieve_guest(self):
+        with self.assertNumQueries(self.DETAIL_QUERIES):
+            response = self.guest_client.get(
+                f'/api/recipes/{self.recipes[0].id}/',
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_retrieve_authenticated(self):
+        with self.assertNumQueries(self.DETAIL_QUERIES + self.AUTH_QUERIES):
+            response = self.auth_client.get(
+                f'/api/recipes/{self.recipes[0].id}/',
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['is_favorited'])
+        self.assertTrue(response.data['is_in_shopping_cart'])
+        self.assertTrue(response.data['author']['is_subscribed'])
+
+
+class RecipeConditionalGetTest(RecipeFixtureMixin, TestCase):
+    """ETag и Last-Modified отдельного рецепта."""
+
+    def test_invalid_pk(self):
+        for client in (self.guest_client, self.auth_client):
+            response = client.get('/api/recipes/abc/')
+            self.assertEqual(response.status_code, 404)
+
+    def test_not_modified(self):
+        url = f'/api/recipes/{self.recipes[0].id}/'
+        for client in (self.guest_client, self.auth_client):
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            for headers in (
+                {'HTTP_IF_NONE_MATCH': response['ETag']},
+                {'HTTP_IF_MODIFIED_SINCE': response['Last-Modified']},
+            ):
+                with self.subTest(headers=headers):
+                    self.assertEqual(client.get(url, **headers).status_code,
+                                     304)
+
+    def test_etag_changes_after_edit(self):
+        recipe = self.recipes[0]
+        url = f'/api/recipes/{recipe.id}/'
+        etag = self.guest_client.get(url)['ETag']
+        recipe.name = 'Новое название'
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.save()
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['name'], 'Новое название')
+
+    @override_settings(ALLOWED_HOSTS=['internal', 'example.com'])
+    def test_cache_per_host(self):
+        url = f'/api/recipes/{self.recipes[0].id}/'
+        for host, secure in (
+            ('internal', False), ('example.com', True), ('internal', False),
+        ):
+            with self.subTest(host=host, secure=secure):
+                response = self.guest_client.get(
+                    url, HTTP_HOST=host, secure=secure,
+                )
+                scheme = 'https' if secure else 'http'
+                self.assertTrue(response.data['image'].startswith(
+                    f'{scheme}://{host}/',
+                ))
+
+
+class IngredientSearchTest(TestCase):
+    """Поиск ингредиентов в справочнике и в базе дает одинаковый ответ."""
+
+    @classmethod
+    def setUpTestData(cls):
+        for name in ('ванильный сахар', 'сахар', 'соль', 'сахарная пудра'):
+            Ingredient.objects.create(name=name, measurement_unit='г')
+
+    def setUp(self):
+        ingredient_catalogue.invalidate()
+
+    def search(self):
+        response = self.client.get('/api/ingredients/?name=Сах')
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.json()]
+
+    def test_prefix_matches_first(self):
+        expected = ['сахар', 'сахарная пудра', 'ванильный сахар']
+        self.assertEqual(self.search(), expected)
+        with mock.patch.object(ingredient_catalogue, 'max_size', 1):
+            ingredient_catalogue.invalidate()
+            self.assertFalse(ingredient_catalogue.is_available())
+            self.assertEqual(self.search(), expected)
+
+
+class RecipeKeysetPaginationTest(RecipeFixtureMixin, TestCase):
+    """Курсорная пагинация рецептов."""
+
+    URL = '/api/recipes/?pagination=cursor&limit=5'
+
+    def encode(self, cursor):
+        return base64.urlsafe_b64encode(json.dumps(cursor).encode()).decode()
+
+    def test_pages(self):
+        for ordering in ('newest', 'popular'):
+            with self.subTest(ordering=ordering):
+                ids = []
+                url = f'{self.URL}&ordering={ordering}'
+                while url:
+                    response = self.guest_client.get(url)
+                    self.assertEqual(response.status_code, 200)
+                    ids.extend(item['id'] for item in response.data['results'])
+                    url = response.data['next']
+                self.assertCountEqual(
+                    ids, [recipe.id for recipe in self.recipes],
+                )
+
+    def test_cursor_uses_index(self):
+        for ordering in ('newest', 'popular'):
+            with self.subTest(ordering=ordering):
+                response = self.guest_client.get(
+                    f'{self.URL}&ordering={ordering}',
+                )
+                with CaptureQueriesContext(connection) as queries:
+                    self.guest_client.get(response.data['next'])
+                sql = next(
+                    query['sql'] for query in queries
+                    if ') < (' in query['sql']
+                )
+                # На нескольких строках без этого планировщик выбирает
+                # последовательный просмотр.
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+                    cursor.execute(f'EXPLAIN {sql}')
+                    plan = '\n'.join(row[0] for row in cursor.fetchall())
+                self.assertIn('Index Cond: (ROW(', plan)
+
+    def test_invalid_cursor(self):
+        cursors = (
+            'not-base64',
+            self.encode(['2020-01-01T00:00:00', 'abc']),
+            self.encode([{'a': 1}, 1]),
+            self.encode(['ab', 1]),
+            self.encode([True, 1]),
+            self.encode('ab'),
+        )
+        for ordering in ('newest', 'popular'):
+            for cursor in cursors:
+                with self.subTest(ordering=ordering, cursor=cursor):
+                    response = self.guest_client.get(
+                        f'{self.URL}&ordering={ordering}&cursor={cursor}',
+                    )
+                    self.assertEqual(response.status_code, 404)
+
+
+@override_settings(COUNT_ESTIMATE_MIN=1)
+@mock.patch('recipes.pagination.get_table_estimate', return_value=2)
+class ApproximateCountPaginationTest(RecipeFixtureMixin, TestCase):
+    """Заниженная оценка количества не скрывает последние страницы."""
+
+    def test_recipe_pages(self, get_table_estimate):
+        for page, has_next in ((1, True), (2, True), (3, False)):
+            with self.subTest(page=page):
+                response = self.guest_client.get(
+                    f'/api/recipes/?limit=5&page={page}',
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.data['count'], 2)
+                self.assertTrue(response.data['count_is_approximate'])
+                self.assertEqual(response.data['next'] is not None, has_next)
+        response = self.guest_client.get('/api/recipes/?limit=5&page=4')
+        self.assertEqual(response.status_code, 404)
+
+    def test_user_pages(self, get_table_estimate):
+        for offset, has_next in ((0, True), (2, False)):
+            with self.subTest(offset=offset):
+                response = self.guest_client.get(
+                    f'/api/users/?limit=2&offset={offset}',
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data['results']), 2)
+                self.assertEqual(response.data['next'] is not None, has_next)
+
+
+class RecipeCountersTest(RecipeFixtureMixin, TestCase):
+    """Счетчики избранного и корзин совпадают с числом строк."""
+
+    def assert_counters_match(self):
+        for recipe in Recipe.objects.all():
+            self.assertEqual(
+                recipe.favorites_count,
+                Favorite.objects.filter(recipe=recipe).count(),
+            )
+            self.assertEqual(
+                recipe.in_carts_count,
+                ShoppingCart.objects.filter(recipe=recipe).count(),
+            )
+
+    def test_row_moved(self):
+        for model in (Favorite, ShoppingCart):
+            with self.subTest(model=model.__name__):
+                row = model.objects.get(
+                    user=self.user, recipe=self.recipes[0],
+                )
+                row.recipe = self.recipes[1]
+                row.save()
+                self.assert_counters_match()
+                row.user = self.authors[0]
+                row.save()
+                self.assert_counters_match()
+
+
+class ShoppingListTest(RecipeFixtureMixin, TestCase):
+    """Сохраненные списки покупок совпадают с корзинами при изменениях
+    через API, ORM и каскадные удаления."""
+
+    def assert_lists_match(self):
+        stored = set(ShoppingListItem.objects.values_list(
+            'user_id', 'ingredient_id', 'total_amount',
+        ))
+        self.assertEqual(stored, set(get_live_totals()))
+
+    def test_cart_changes(self):
+        recipe = self.recipes[1]
+        ShoppingCart.objects.create(user=self.authors[0], recipe=recipe)
+        self.assert_lists_match()
+        response = self.auth_client.post(
+            f'/api/recipes/{recipe.id}/shopping_cart/',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assert_lists_match()
+        response = self.auth_client.delete(
+            f'/api/recipes/{self.recipes[0].id}/shopping_cart/',
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assert_lists_match()
+        ShoppingCart.objects.filter(recipe=recipe).delete()
+        self.assert_lists_match()
+
+    def test_cart_row_moved(self):
+        in_cart = ShoppingCart.objects.get(
+            user=self.user, recipe=self.recipes[0],
+        )
+        in_cart.recipe = self.recipes[1]
+        in_cart.save()
+        self.assert_lists_match()
+        in_cart.user = self.authors[0]
+        in_cart.save()
+        self.assert_lists_match()
+        in_cart.save()
+        self.assert_lists_match()
+
+    def test_recipe_ingredient_changes(self):
+        recipe = self.recipes[0]
+        ShoppingCart.objects.create(user=self.authors[1], recipe=recipe)
+        first, second = recipe.ingredient_recipe.all()[:2]
+        first.amount += 5
+        first.save()
+        self.assert_lists_match()
+        second.ingredient = self.ingredients[4]
+        second.save()
+        self.assert_lists_match()
+        IngredientInRecipe.objects.create(
+            recipe=recipe, ingredient=self.ingredients[3], amount=7,
+        )
+        self.assert_lists_match()
+        first.delete()
+        self.assert_lists_match()
+
+    def test_recipe_update(self):
+        recipe = self.recipes[0]
+        client = APIClient()
+        client.force_authenticate(recipe.author)
+        with tempfile.TemporaryDirectory() as media_root:
+            with override_settings(MEDIA_ROOT=media_root):
+                response = client.patch(
+                    f'/api/recipes/{recipe.id}/',
+                    {
+                        'tags': [self.tags[0].id],
+                        'ingredients': [
+                            {'id': self.ingredients[0].id, 'amount': 100},
+                            {'id': self.ingredients[4].id, 'amount': 3},
+                        ],
+                        'name': 'Рецепт',
+                        'text': 'Описание',
+                        'cooking_time': 5,
+                        'image': get_image(),
+                    },
+                    format='json',
+                )
+        self.assertEqual(response.status_code, 200)
+        self.assert_lists_match()
+
+    def test_recipe_delete(self):
+        ShoppingCart.objects.create(
+            user=self.authors[1], recipe=self.recipes[2],
+        )
+        self.recipes[2].delete()
+        self.assert_lists_match()
+        self.authors[0].delete()
+        self.assert_lists_match()
+        self.ingredients[0].delete()
+        self.assert_lists_match()
+
+
+class ShoppingListDownloadTest(RecipeFixtureMixin, TestCase):
+    """Выгрузка списка покупок в разных форматах."""
+
+    URL = '/api/recipes/download_shopping_cart/'
+
+    def download(self, file_format):
+        response = self.auth_client.get(f'{self.URL}?format={file_format}')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def expected_rows(self):
+        return [
+            [name, unit, str(amount)]
+            for name, unit, amount in self.user.shopping_list.values_list(
+                'ingredient__name', 'ingredient__measurement_unit',
+                'total_amount',
+            ).order_by('ingredient__name')
+        ]
+
+    def test_invalid_format(self):
+        response = self.auth_client.get(f'{self.URL}?format=xls')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('txt, csv, pdf', response.data['detail'])
+
+    def test_empty(self):
+        client = APIClient()
+        client.force_authenticate(self.authors[0])
+        response = client.get(f'{self.URL}?format=csv')
+        self.assertEqual(response.status_code, 400)
+
+    def test_txt(self):
+        response, content = self.download('txt')
+        self.assertEqual(
+            response['Content-Type'], 'text/plain; charset=utf-8',
+        )
+        self.assertEqual(content.decode().splitlines(), [
+            f'{name} ({unit}) — {amount}'
+            for name, unit, amount in self.expected_rows()
+        ])
+
+    def test_csv(self):
+        response, content = self.download('csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertTrue(response['Content-Disposition'].endswith('.csv'))
+        self.assertTrue(content.startswith('\ufeff'.encode()))
+        rows = list(csv.reader(io.StringIO(content.decode('utf-8-sig'))))
+        self.assertEqual(
+            rows[0], ['Ингредиент', 'Единица измерения', 'Количество'],
+        )
+        self.assertEqual(rows[1:], self.expected_rows())
+
+    def test_pdf(self):
+        response, content = self.download('pdf')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(content.startswith(b'%PDF'))
+        self.assertTrue(content.rstrip().endswith(b'%%EOF'))
+
+
+@mock.patch.object(short_link_cache, 'backend', 'default')
+class ShortLinkCacheTest(RecipeFixtureMixin, TestCase):
+    """Короткие ссылки в кеше процесса и в общем кеше."""
+
+    def other_process_cache(self):
+        return LRUCache(
+            maxsize=10, ttl=60, backend='default', prefix='short-link:',
+        )
+
+    def test_invalidation(self):
+        recipe = self.recipes[0]
+        pk = recipe.id
+        url = self.guest_client.get(
+            f'/api/recipes/{pk}/get-link/',
+        ).data['short-link']
+        link = url.rstrip('/').rsplit('/', 1)[-1]
+        for hits, misses in ((0, 1), (1, 0)):
+            before = short_link_cache.stats()
+            response = self.guest_client.get(f'/s/{link}/')
+            self.assertRedirects(
+                response, f'/recipes/{pk}',
+                fetch_redirect_response=False,
+            )
+            after = short_link_cache.stats()
+            self.assertEqual(after['hits'] - before['hits'], hits)
+            self.assertEqual(after['misses'] - before['misses'], misses)
+        other = self.other_process_cache()
+        self.assertEqual(other.get(link), pk)
+        # Короткая ссылка сохранена в базе в обход этого объекта.
+        recipe.refresh_from_db()
+        recipe.delete()
+        self.assertEqual(self.guest_client.get(f'/s/{link}/').status_code, 404)
+        self.assertIsNone(self.other_process_cache().get(link))
+        # Копия в памяти другого процесса живет до SHORT_LINK_CACHE_TTL.
+        self.assertEqual(other.get(link), pk)
+
+    def test_existing_link_kept(self):
+        recipe = self.recipes[1]
+        Recipe.objects.filter(pk=recipe.pk).update(short_link='old')
+        response = self.guest_client.get(
+            f'/api/recipes/{recipe.pk}/get-link/',
+        )
+        self.assertTrue(response.data['short-link'].endswith('/s/old/'))
+
+
+@override_settings(IMAGE_WORKERS=0, IMAGE_FORMAT='WEBP')
+class ImageProcessingTest(RecipeFixtureMixin, TestCase):
+    """Картинки перекодируются после фиксации транзакции, а не в запросе."""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        override = override_settings(MEDIA_ROOT=media_root.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_recipe_image(self):
+        client = APIClient()
+        client.force_authenticate(self.authors[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(
+                '/api/recipes/',
+                {
+                    'tags': [self.tags[0].id],
+                    'ingredients': [
+                        {'id': self.ingredients[0].id, 'amount': 1},
+                    ],
+                    'name': 'Рецепт с картинкой',
+                    'text': 'Описание',
+                    'cooking_time': 5,
+                    'image': get_image(),
+                },
+                format='json',
+            )
+            self.assertEqual(response.status_code, 201)
+            self.assertTrue(response.data['image'].endswith('.png'))
+        recipe = Recipe.objects.get(pk=response.data['id'])
+        self.assertTrue(recipe.image.name.endswith('.webp'))
+        self.assertTrue(recipe.thumbnail.name.endswith('.webp'))
+
+    def test_avatar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.auth_client.put(
+                '/api/users/me/avatar/', {'avatar': get_image()},
+                format='json',
+            )
+            self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.avatar.name.endswith('.webp'))
+
+
+class AsyncViewsTest(RecipeFixtureMixin, TestCase):
+    """Асинхронные списки отвечают так же, как синхронные вьюсеты."""
+
+    def test_same_as_viewsets(self):
+        for view, path in (
+            (tag_list, '/api/tags/'),
+            (ingredient_list, '/api/ingredients/'),
+        ):
+            for method, extra in (
+                ('get', {}),
+                ('get', {'data': {'format': 'api'}}),
+                ('get', {'HTTP_ACCEPT': 'text/html'}),
+                ('post', {}),
+                ('options', {}),
+                ('head', {}),
+                ('get', {'HTTP_AUTHORIZATION': 'Token bad'}),
+                ('get', {
+                    'HTTP_AUTHORIZATION': f'Token {self.token.key}',
+                }),
+            ):
+                with self.subTest(path=path, method=method, extra=extra):
+                    request = getattr(RequestFactory(), method)(path, **extra)
+                    response = async_to_sync(view)(request)
+                    expected = getattr(self.client, method)(path, **extra)
+                    self.assertEqual(
+                        response.status_code, expected.status_code,
+                    )
+                    self.assertEqual(
+                        response['Content-Type'], expected['Content-Type'],
+                    )
+                    # В HTML есть CSRF-токен, а тестовый клиент отбрасывает
+                    # тело ответа на HEAD.
+                    if method == 'get' and set(extra) <= {
+                        'HTTP_AUTHORIZATION',
+                    }:
+                        self.assertEqual(response.content, expected.content)
+
+    def test_authorization(self):
+        for view, path in (
+            (tag_list, '/api/tags/'),
+            (ingredient_list, '/api/ingredients/'),
+        ):
+            for token, status in (('bad', 401), (self.token.key, 200)):
+                with self.subTest(path=path, token=token):
+                    request = RequestFactory().get(
+                        path, HTTP_AUTHORIZATION=f'Token {token}',
+                    )
+                    response = async_to_sync(view)(request)
+                    self.assertEqual(response.status_code, status)
+
+
+class AdminChangelistQueriesTest(RecipeFixtureMixin, TestCase):
+    """Число запросов к базе на страницах списков админки не зависит от
+    количества объектов."""
+
+    URLS = (
+        '/admin/recipes/recipe/',
+        '/admin/recipes/favorite/',
+        '/admin/recipes/shoppingcart/',
+        '/admin/users/follow/',
+    )
+
+    def setUp(self):
+        super().setUp()
+        admin = CustomUser.objects.create_superuser(
+            email='admin@example.com',
+            username='admin',
+            password='password',
+            first_name='Имя',
+            last_name='Фамилия',
+        )
+        self.client.force_login(admin)
+
+    def count_queries(self):
+        counts = {}
+        for url in self.URLS:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            counts[url] = len(queries)
+        return counts
+
+    def test_changelists(self):
+        counts = self.count_queries()
+        users = [create_user(number) for number in range(10, 20)]
+        recipes = self.create_recipes(24, start=len(self.recipes))
+        for user in users:
+            for recipe in recipes[::3]:
+                Favorite.objects.create(user=user, recipe=recipe)
+                ShoppingCart.objects.create(user=user, recipe=recipe)
+            for author in self.authors:
+                Follow.objects.create(user=user, following=author)
+        self.assertEqual(self.count_queries(), counts)
+
+
+class BenchmarkCommandTest(RecipeFixtureMixin, TestCase):
+    """Прогон benchmark не оставляет синтетических данных в кешах."""
+
+    def get_lists(self):
+        recipes = self.guest_client.get('/api/recipes/').json()
+        tags = self.guest_client.get('/api/tags/').json()
+        return recipes['count'], [recipe['name'] for recipe in recipes[
+            'results'
+        ]], [tag['slug'] for tag in tags]
+
+    # Замер нового соединения закрывает его, а с ним и транзакцию теста.
+    @mock.patch.object(
+        benchmark.Command, 'measure_connection', return_value={},
+    )
+    def test_caches_untouched(self, measure_connection):
+        before = self.get_lists()
+        self.clear_caches()
+        call_command(
+            'benchmark', users=3, recipes=5, ingredients=10,
+            ingredients_per_recipe=2, favorites=5, follows=2, repeat=1,
+            stdout=io.StringIO(),
+        )
+        self.assertEqual(self.get_lists(), before)
+        self.assertEqual(before[0], Recipe.objects.count())
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
@@ -11,3 +12,11 @@ v1_router.register('tags', TagViewSet, basename='tags')
 urlpatterns = [
     path('', include(v1_router.urls)),
 ]
+
+if settings.ASYNC_VIEWS:
+    from recipes.async_views import ingredient_list, tag_list
+
+    urlpatterns = [
+        path('ingredients/', ingredient_list, name='ingredients-list'),
+        path('tags/', tag_list, name='tags-list'),
+    ] + urlpatterns
@@ -0,0 +1,20 @@
+from django.conf import settings
+
+from recipes.constants import SHORT_LINK_ALPHABET
+
+
+def encode_short_link(pk, min_length=None):
+    """Кодирует id рецепта в base62 без обращений к базе.
+
+    Смещение гарантирует длину не меньше min_length, поэтому новые ссылки
+    не пересекаются с короткими ссылками, выданными раньше.
+    """
+    if min_length is None:
+        min_length = settings.SHORT_LINK_MIN_LENGTH
+    base = len(SHORT_LINK_ALPHABET)
+    number = pk + base ** (min_length - 1)
+    link = ''
+    while number:
+        number, remainder = divmod(number, base)
+        link = SHORT_LINK_ALPHABET[remainder] + link
+    return link
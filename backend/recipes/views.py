@@ -1,9 +1,11 @@
-from random import choices
-from string import ascii_letters, digits
+from itertools import chain
 
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import HttpResponse, HttpResponseRedirect
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from django.http import (Http404, HttpResponse, HttpResponseRedirect,
+                         StreamingHttpResponse)
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets
@@ -11,20 +13,30 @@ from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
+from recipes.cache import short_link_cache
+from recipes.catalogue import ingredient_catalogue
+from recipes.constants import RECIPE_ORDERINGS, SHOPPING_LIST_CHUNK_SIZE
 from recipes.filters import IngredientFilter, RecipeFilter
-from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
-from recipes.pagination import RecipePagination
+from recipes.models import Ingredient, Recipe, Tag
+from recipes.pagination import (RecipeKeysetPagination, RecipePagination,
+                                get_recipe_ordering)
 from recipes.permissions import IsAuthorOrReadOnly
+from recipes.response_cache import (AnonymousCacheMixin, ConditionalGetMixin,
+                                    get_versions)
 from recipes.serializers import (IngredientSerializer, RecipeCreateSerializer,
                                  RecipeListSerializer, TagSerializer)
+from recipes.shopping_list import SHOPPING_LIST_FORMATS
+from recipes.utils import encode_short_link
 from users.serializers import RecipeMinifiedSerializer
 
 User = get_user_model()
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(ConditionalGetMixin, AnonymousCacheMixin,
+                 viewsets.ModelViewSet):
     """Вьюсет тегов."""
 
+    cache_models = ('recipes.tag',)
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (AllowAny,)
@@ -32,9 +44,16 @@ class TagViewSet(viewsets.ModelViewSet):
     pagination_class = None
 
 
-class IngredientViewSet(viewsets.ModelViewSet):
-    """Вьюсет ингредиентов."""
+class IngredientViewSet(ConditionalGetMixin, AnonymousCacheMixin,
+                        viewsets.ModelViewSet):
+    """Вьюсет ингредиентов.
 
+    Список отдается из справочника в памяти процесса, поэтому кеш ответов
+    используется только для отдельных ингредиентов и для списков, когда
+    справочник слишком велик и поиск идет в базе.
+    """
+
+    cache_models = ('recipes.ingredient',)
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (AllowAny,)
@@ -43,10 +62,32 @@ class IngredientViewSet(viewsets.ModelViewSet):
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
 
+    def list(self, request, *args, **kwargs):
+        if not ingredient_catalogue.is_available():
+            return super().list(request, *args, **kwargs)
+        return self.conditional(self.list_catalogue, request, *args, **kwargs)
+
+    def list_catalogue(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if name:
+            return Response(ingredient_catalogue.search(name))
+        return HttpResponse(
+            ingredient_catalogue.as_json(),
+            content_type='application/json',
+        )
 
-class RecipeViewSet(viewsets.ModelViewSet):
+
+class RecipeViewSet(ConditionalGetMixin, AnonymousCacheMixin,
+                    viewsets.ModelViewSet):
     """Вьюсет рецептов с дополнительными действиями."""
 
+    cache_models = (
+        'recipes.recipe', 'recipes.tag', 'recipes.ingredient',
+        'recipes.ingredientinrecipe', 'users.customuser',
+    )
+    user_cache_models = (
+        'recipes.favorite', 'recipes.shoppingcart', 'users.follow',
+    )
     queryset = Recipe.objects.all()
     serializer_class = RecipeCreateSerializer
     permission_classes = (IsAuthorOrReadOnly,)
@@ -54,6 +95,48 @@ class RecipeViewSet(viewsets.ModelViewSet):
     filterset_class = RecipeFilter
     filter_backends = (DjangoFilterBackend,)
 
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if self.request.query_params.get('pagination') == 'cursor':
+                self._paginator = RecipeKeysetPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def get_cache_models(self):
+        # Порядок популярных рецептов зависит от избранного.
+        if get_recipe_ordering(self.request) == RECIPE_ORDERINGS['popular']:
+            return self.cache_models + ('recipes.favorite',)
+        return self.cache_models
+
+    def get_fingerprint(self):
+        if self.action != 'retrieve':
+            return super().get_fingerprint()
+        # Отдельный рецепт проверяется по своей дате изменения, а не по
+        # версии всех рецептов.
+        # Для некорректного pk ответ 404 отдаст get_object().
+        try:
+            updated_at = Recipe.objects.filter(
+                pk=self.kwargs['pk'],
+            ).values_list('updated_at', flat=True).first()
+        except (TypeError, ValueError, ValidationError):
+            return None
+        if updated_at is None:
+            return None
+        return get_versions(
+            label for label in self.get_version_labels()
+            if label != 'recipes.recipe'
+        ) + [int(updated_at.timestamp() * 10 ** 6)]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            queryset = queryset.order_by(*get_recipe_ordering(self.request))
+        if self.action in ['list', 'retrieve']:
+            return queryset.for_read(self.request.user)
+        return queryset
+
     def get_serializer_class(self):
         if self.action in ['list', 'retrieve']:
             return RecipeListSerializer
@@ -73,14 +156,13 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     def get_link(self, request, pk):
         recipe = get_object_or_404(Recipe, id=pk)
-        if recipe.short_link is None:
-            link = None
-            while Recipe.objects.filter(short_link=link).exists():
-                link = ''.join(choices(
-                    population=(ascii_letters + digits), k=3,
-                ))
-            recipe.short_link = link
-            recipe.save()
+        if not recipe.short_link:
+            recipe.short_link = encode_short_link(recipe.pk)
+            # Ссылка однозначно задается id, поэтому при гонке запросов
+            # записывает ее только первый, а остальные получают ту же.
+            Recipe.objects.filter(
+                Q(short_link__isnull=True) | Q(short_link=''), pk=recipe.pk,
+            ).update(short_link=recipe.short_link)
         url = f'/s/{recipe.short_link}/'
         return Response(
             {'short-link': request.build_absolute_uri(url)},
@@ -134,10 +216,12 @@ class RecipeViewSet(viewsets.ModelViewSet):
                     {'detail': 'Рецепт уже находится в корзине!'},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-            user.in_shopping_cart.create(
-                user=user,
-                recipe=recipe,
-            )
+            # Список покупок обновляется сигналом в той же транзакции.
+            with transaction.atomic():
+                user.in_shopping_cart.create(
+                    user=user,
+                    recipe=recipe,
+                )
             serializer = RecipeMinifiedSerializer(recipe)
             return Response(
                 serializer.data,
@@ -151,45 +235,63 @@ class RecipeViewSet(viewsets.ModelViewSet):
         in_cart.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    def perform_content_negotiation(self, request, force=False):
+        # Параметр format у выгрузки выбирает формат файла, а не рендерер.
+        if self.action == 'download_shopping_cart':
+            force = True
+        return super().perform_content_negotiation(request, force)
+
     @action(
         detail=False,
         permission_classes=[IsAuthenticated],
     )
     def download_shopping_cart(self, request):
         user = request.user
-        shopping_list = IngredientInRecipe.objects.select_related(
-            'recipe',
-        ).filter(
-            recipe__in_shopping_cart__user=user,
-        ).values(
+        file_format = request.query_params.get('format', 'txt')
+        if file_format not in SHOPPING_LIST_FORMATS:
+            return Response(
+                {'detail': 'Доступные форматы: '
+                           f'{", ".join(SHOPPING_LIST_FORMATS)}.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        shopping_list = user.shopping_list.values_list(
             'ingredient__name',
             'ingredient__measurement_unit',
-        ).annotate(
-            sum_amount=Sum('amount'),
-        )
-        if not shopping_list:
+            'total_amount',
+        ).order_by(
+            'ingredient__name',
+        ).iterator(chunk_size=SHOPPING_LIST_CHUNK_SIZE)
+        first = next(shopping_list, None)
+        if first is None:
             return Response(
                 {'detail': 'Список покупок пуст!'},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        ingredients = '\n'.join(
-            f'{ingredient["ingredient__name"]} '
-            f'({ingredient["ingredient__measurement_unit"]}) '
-            f'— {ingredient["sum_amount"]}'
-            for ingredient in shopping_list
-        )
-        filename = f'foodgram_shopping_list_{user.username}'
-        return HttpResponse(
-            ingredients,
+        content_type, render = SHOPPING_LIST_FORMATS[file_format]
+        filename = f'foodgram_shopping_list_{user.username}.{file_format}'
+        return StreamingHttpResponse(
+            render(chain((first,), shopping_list)),
             headers={
-                'Content-Type': 'text/plain',
+                'Content-Type': content_type,
                 'Content-Disposition': f'attachment; filename={filename}',
             },
         )
 
 
+def get_short_link_target(link):
+    """Id рецепта по короткой ссылке."""
+    pk = short_link_cache.get(link)
+    if pk is None:
+        pk = Recipe.objects.filter(
+            short_link=link,
+        ).values_list('pk', flat=True).first()
+        if pk is None:
+            raise Http404('Рецепт не найден.')
+        short_link_cache.set(link, pk)
+    return pk
+
+
 def redirect_short_link(request, link):
     """Перенаправление с короткой ссылки на нужный рецепт."""
 
-    recipe = get_object_or_404(Recipe, short_link=link)
-    return HttpResponseRedirect(f'/recipes/{recipe.pk}')
+    return HttpResponseRedirect(f'/recipes/{get_short_link_target(link)}')
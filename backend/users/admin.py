@@ -18,11 +18,12 @@ class FollowForm(forms.ModelForm):
 @admin.register(CustomUser)
 class CustomUserAdmin(admin.ModelAdmin):
     list_display = (
-        'email', 'username', 'first_name', 'last_name',
+        'email', 'username', 'first_name', 'last_name', 'recipes_count',
     )
     search_fields = (
         'email', 'username',
     )
+    show_full_result_count = False
     empty_value_display = '-не задано-'
     exclude = ('password',)
 
@@ -30,6 +31,11 @@ class CustomUserAdmin(admin.ModelAdmin):
 @admin.register(Follow)
 class FollowAdmin(admin.ModelAdmin):
     form = FollowForm
+    list_display = ('user', 'following')
+    list_select_related = ('user', 'following')
+    search_fields = ('user__username', 'following__username')
+    raw_id_fields = ('user', 'following')
+    show_full_result_count = False
 
 
 admin.site.unregister(Group)
@@ -0,0 +1,56 @@
+import copy
+
+from django.conf import settings
+from rest_framework.authentication import TokenAuthentication
+
+from recipes.cache import LRUCache
+from recipes.response_cache import bump_version, get_versions
+
+token_cache = LRUCache(
+    maxsize=settings.TOKEN_CACHE_SIZE,
+    ttl=settings.TOKEN_CACHE_TTL,
+)
+
+
+def auth_version_label(user_pk):
+    return f'authtoken.token:{user_pk}'
+
+
+def revoke_user_tokens(user_pk):
+    """Сбрасывает кеш токенов пользователя во всех процессах."""
+    bump_version(auth_version_label(user_pk))
+
+
+def get_auth_version(user_pk):
+    return get_versions([auth_version_label(user_pk)])[0]
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Аутентификация по токену с кешем токен → пользователь в процессе.
+
+    Вместе с пользователем запоминается его версия из общего для всех
+    процессов кеша. Версия увеличивается при выходе, удалении токена и
+    изменении пользователя, и запись с устаревшей версией загружается из
+    базы заново.
+    """
+
+    def load(self, key, version=None):
+        user, token = super().authenticate_credentials(key)
+        if version is None:
+            version = get_auth_version(user.pk)
+        token_cache.set(key, (user, token, version))
+        return user, token
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is None:
+            user, token = self.load(key)
+        else:
+            user, token, version = cached
+            current = get_auth_version(user.pk)
+            if current != version:
+                token_cache.delete(key)
+                user, token = self.load(key, current)
+        # Каждый запрос получает свою копию, чтобы изменения пользователя
+        # в одном потоке не были видны в других.
+        return copy.copy(user), token
@@ -1,2 +1,3 @@
 MAX_LENGTH_NAME = 150
 MAX_LENGTH_EMAIL = 254
+RECIPES_LIMIT = 6
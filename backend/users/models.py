@@ -1,9 +1,27 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
+from django.db.models import BooleanField, Exists, OuterRef, Value
 
 from .constants import MAX_LENGTH_EMAIL, MAX_LENGTH_NAME
 
 
+class CustomUserQuerySet(models.QuerySet):
+
+    def with_is_subscribed(self, user):
+        """Признак подписки user на каждого пользователя выборки."""
+        if not user.is_authenticated:
+            return self.annotate(
+                is_subscribed=Value(False, output_field=BooleanField()),
+            )
+        return self.annotate(is_subscribed=Exists(
+            Follow.objects.filter(user=user, following=OuterRef('pk')),
+        ))
+
+
+class CustomUserManager(UserManager.from_queryset(CustomUserQuerySet)):
+    """Менеджер пользователей с методами CustomUserQuerySet."""
+
+
 class CustomUser(AbstractUser):
     """Кастомная модель юзера с добавлением аватара."""
 
@@ -30,6 +48,11 @@ class CustomUser(AbstractUser):
         null=True, blank=True,
         default=None,
     )
+    recipes_count = models.PositiveIntegerField(
+        'Количество рецептов', default=0, editable=False,
+    )
+    objects = CustomUserManager()
+
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
 
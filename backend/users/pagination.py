@@ -0,0 +1,44 @@
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.utils.urls import replace_query_param
+
+from recipes.pagination import get_count
+
+
+class UserPagination(LimitOffsetPagination):
+    """Пагинатор пользователей с приблизительным подсчетом.
+
+    Количество только выводится в ответе, наличие следующей страницы
+    определяется выборкой на один объект больше limit.
+    """
+
+    def get_count(self, queryset):
+        count, self.count_is_approximate = get_count(queryset)
+        return count
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.offset = self.get_offset(request)
+        self.request = request
+        objects = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.has_next = len(objects) > self.limit
+        self.count = self.get_count(queryset)
+        return objects[:self.limit]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = replace_query_param(
+            self.request.build_absolute_uri(),
+            self.limit_query_param,
+            self.limit,
+        )
+        return replace_query_param(
+            url, self.offset_query_param, self.offset + self.limit,
+        )
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data['count_is_approximate'] = self.count_is_approximate
+        return response
@@ -3,16 +3,38 @@ import re
 
 from django.contrib.auth import authenticate, get_user_model
 from django.core.files.base import ContentFile
-from django.db.models import Count
+from django.db.models import BooleanField, OuterRef, Prefetch, Value
 from djoser.serializers import UserCreateSerializer
 from rest_framework import serializers
 
+from recipes.images import validate_image
 from recipes.models import Recipe
+from users.constants import RECIPES_LIMIT
 from users.models import Follow
 
 User = get_user_model()
 
 
+def with_subscription_data(queryset, recipes_limit):
+    """Авторы с recipes_limit последними рецептами.
+
+    Рецепты всех авторов страницы загружаются одним запросом: каждый
+    рецепт проходит фильтр, только если входит в первые recipes_limit
+    рецептов своего автора.
+    """
+    if recipes_limit:
+        recipes = Recipe.objects.filter(id__in=Recipe.objects.filter(
+            author=OuterRef('author'),
+        ).values('id')[:recipes_limit])
+    else:
+        recipes = Recipe.objects.none()
+    return queryset.annotate(
+        is_subscribed=Value(True, output_field=BooleanField()),
+    ).prefetch_related(
+        Prefetch('recipes', queryset=recipes, to_attr='recipes_preview'),
+    )
+
+
 class Base64ImageField(serializers.ImageField):
     """Кастомный сериализатор для картинок."""
 
@@ -21,12 +43,21 @@ class Base64ImageField(serializers.ImageField):
             format, imgstr = data.split(';base64,')
             ext = format.split('/')[-1]
             data = ContentFile(base64.b64decode(imgstr), name='image.' + ext)
-        return super().to_internal_value(data)
+        return validate_image(super().to_internal_value(data))
+
+
+class RecipeThumbnailField(serializers.ImageField):
+    """Миниатюра рецепта, а пока она не создана — исходная картинка."""
+
+    def get_attribute(self, instance):
+        return instance.thumbnail or instance.image
 
 
 class RecipeMinifiedSerializer(serializers.ModelSerializer):
     """Сериализатор для рецептов с сокращенным количеством полей в профиле."""
 
+    image = RecipeThumbnailField(read_only=True)
+
     class Meta:
         model = Recipe
         fields = (
@@ -79,10 +110,19 @@ class UserSerializer(serializers.ModelSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         user = self.context['request'].user
-        if not user.is_authenticated:
+        # Подписка на себя запрещена ограничением модели Follow.
+        if not user.is_authenticated or obj.pk == user.pk:
             return False
-        return user.follower.filter(following__id=obj.id).exists()
+        # Подписки загружаются один раз и общие для всех вложенных
+        # сериализаторов: контекст у них берется от корневого.
+        if 'followed_ids' not in self.context:
+            self.context['followed_ids'] = set(
+                user.follower.values_list('following_id', flat=True),
+            )
+        return obj.pk in self.context['followed_ids']
 
 
 class UserRegistrationSerializer(UserCreateSerializer):
@@ -124,7 +164,7 @@ class FollowSerializer(UserSerializer):
     """Сериализатор системы подписок."""
 
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.IntegerField()
+    recipes_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = User
@@ -134,14 +174,12 @@ class FollowSerializer(UserSerializer):
         )
 
     def get_recipes(self, obj):
-        limit = self.context['request'].query_params.get(
-            'recipes_limit', 6,
-        )
-        try:
-            recipes_limit = int(limit)
-        except ValueError:
-            raise serializers.ValidationError('Введите целое число.')
-        recipes = obj.recipes.all()[:recipes_limit]
+        if hasattr(obj, 'recipes_preview'):
+            recipes = obj.recipes_preview
+        else:
+            recipes = obj.recipes.all()[
+                :self.context.get('recipes_limit', RECIPES_LIMIT)
+            ]
         return RecipeMinifiedSerializer(instance=recipes, many=True).data
 
 
@@ -168,8 +206,9 @@ class AddFollowSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         return FollowSerializer(
-            instance=User.objects.filter(
-                id=instance.following_id,
-            ).annotate(recipes_count=Count('recipes')).first(),
+            instance=with_subscription_data(
+                User.objects.filter(id=instance.following_id),
+                self.context.get('recipes_limit', RECIPES_LIMIT),
+            ).first(),
             context=self.context,
         ).data
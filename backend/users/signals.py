@@ -0,0 +1,34 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from recipes.images import process_avatar, schedule_image_processing
+from users.authentication import revoke_user_tokens
+from users.models import CustomUser
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_user_tokens(sender, instance, **kwargs):
+    revoke_user_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_token(sender, instance, **kwargs):
+    revoke_user_tokens(instance.user_id)
+
+
+@receiver(pre_save, sender=CustomUser)
+def remember_avatar_upload(sender, instance, **kwargs):
+    # Новый файл записывается в хранилище уже после этого сигнала.
+    instance._avatar_uploaded = (
+        bool(instance.avatar) and not instance.avatar._committed
+    )
+
+
+@receiver(post_save, sender=CustomUser)
+def process_avatar_upload(sender, instance, **kwargs):
+    if instance.__dict__.pop('_avatar_uploaded', False):
+        schedule_image_processing(
+            process_avatar, instance.pk, instance.avatar.name,
+        )
@@ -0,0 +1,46 @@
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from users.authentication import revoke_user_tokens, token_cache
+from users.models import CustomUser
+
+
+class TokenCacheTest(TestCase):
+    """Кеш токенов в процессе сбрасывается через общий кеш версий."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email='user@example.com',
+            username='user',
+            password='password',
+            first_name='Имя',
+            last_name='Фамилия',
+        )
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        token_cache.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def get_me(self):
+        return self.client.get('/api/users/me/').status_code
+
+    def test_revoked_in_other_process(self):
+        self.assertEqual(self.get_me(), 200)
+        # Изменение в базе без сигналов этого процесса: пока версия не
+        # увеличена, пользователь берется из кеша.
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.get_me(), 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            revoke_user_tokens(self.user.pk)
+        self.assertEqual(self.get_me(), 401)
+
+    def test_logout(self):
+        self.assertEqual(self.get_me(), 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.get_me(), 401)
@@ -1,19 +1,21 @@
 from django.contrib.auth import get_user_model
-from django.db.models import Count
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
 from rest_framework import status, views
 from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.decorators import action
-from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import (IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
 
+from users.authentication import revoke_user_tokens, token_cache
+from users.constants import RECIPES_LIMIT
+from users.pagination import UserPagination
 from users.serializers import (AddFollowSerializer, FollowSerializer,
                                TokenObtainSerializer, UserAvatarSerializer,
-                               UserSerializer)
+                               UserSerializer, with_subscription_data)
 
 User = get_user_model()
 
@@ -35,7 +37,12 @@ class CustomTokenLogout(views.APIView):
     """Выход пользователя из системы и удаление его токена."""
 
     def post(self, request):
+        # Другие процессы сбрасывают запись после фиксации транзакции,
+        # а в этом процессе она больше не нужна сразу. Ключ берется до
+        # удаления токена, которое его обнуляет.
+        token_cache.delete(request.auth.key)
         request.user.auth_token.delete()
+        revoke_user_tokens(request.user.pk)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -43,7 +50,25 @@ class CustomUserViewSet(UserViewSet):
     """Кастомный вьюсет пользователя с дополнительными действиями."""
 
     permission_classes = (IsAuthenticatedOrReadOnly,)
-    pagination_class = LimitOffsetPagination
+    pagination_class = UserPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            return queryset.with_is_subscribed(self.request.user)
+        return queryset
+
+    def get_recipes_limit(self):
+        limit = self.request.query_params.get('recipes_limit', RECIPES_LIMIT)
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = -1
+        if limit < 0:
+            raise ValidationError(
+                {'recipes_limit': 'Введите целое неотрицательное число.'},
+            )
+        return limit
 
     @action(
         detail=False,
@@ -82,7 +107,6 @@ class CustomUserViewSet(UserViewSet):
     def subscribe(self, request, id):
         user = request.user
         author = get_object_or_404(User, id=id)
-        context = {'request': request}
 
         if request.method == 'POST':
             serializer = AddFollowSerializer(
@@ -90,7 +114,10 @@ class CustomUserViewSet(UserViewSet):
                     'user': user.id,
                     'following': author.id,
                 },
-                context=context,
+                context={
+                    'request': request,
+                    'recipes_limit': self.get_recipes_limit(),
+                },
             )
             serializer.is_valid(raise_exception=True)
             serializer.save()
@@ -112,9 +139,10 @@ class CustomUserViewSet(UserViewSet):
         permission_classes=[IsAuthenticated],
     )
     def subscriptions(self, request):
-        followers = User.objects.filter(
-            following__user=request.user,
-        ).annotate(recipes_count=Count('recipes'))
+        followers = with_subscription_data(
+            User.objects.filter(following__user=request.user),
+            self.get_recipes_limit(),
+        )
         page = self.paginate_queryset(followers)
         if page is not None:
             serializer = FollowSerializer(